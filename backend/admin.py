@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from database import get_db
+from database import get_db, get_read_db, engine, reader_engine, replica_engines, pool_status
 from models import User, Instructor, Course, Enrollment, Payment, Review, AIInteraction
 from auth import get_current_user
+from pagination import CursorQuery, keyset_page, finish_keyset_page
+from cache import course_cache, facets_cache
+from normalize import folded_equals, folded_prefix
+from search import apply_course_search
+from suggest import suggest_index
+from counters import reconcile_enrollment_counters
+from ratings import count_review, recompute_ratings
 
 admin_router = APIRouter()
 
@@ -74,38 +81,38 @@ def require_admin(current_user: User = Depends(get_current_user)):
 @admin_router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Basic counts
-    total_users = db.query(User).count()
-    total_instructors = db.query(Instructor).filter(Instructor.is_approved == True).count()
-    total_courses = db.query(Course).count()
-    total_enrollments = db.query(Enrollment).count()
+    total_users = await db.scalar(select(func.count(User.id)))
+    total_instructors = await db.scalar(select(func.count(Instructor.id)).where(Instructor.is_approved == True))
+    total_courses = await db.scalar(select(func.count(Course.id)))
+    total_enrollments = await db.scalar(select(func.count(Enrollment.id)))
     
     # Revenue calculation
-    total_revenue = db.query(func.sum(Payment.amount)).filter(
+    total_revenue = await db.scalar(select(func.sum(Payment.amount)).where(
         Payment.payment_status == "completed"
-    ).scalar() or 0.0
+    )) or 0.0
     
-    pending_instructor_approvals = db.query(Instructor).filter(
+    pending_instructor_approvals = await db.scalar(select(func.count(Instructor.id)).where(
         Instructor.is_approved == False
-    ).count()
+    ))
     
-    active_courses = db.query(Course).filter(Course.is_published == True).count()
+    active_courses = await db.scalar(select(func.count(Course.id)).where(Course.is_published == True))
     
     # This month stats
     this_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    users_this_month = db.query(User).filter(
+    users_this_month = await db.scalar(select(func.count(User.id)).where(
         User.created_at >= this_month_start
-    ).count()
+    ))
     
-    revenue_this_month = db.query(func.sum(Payment.amount)).filter(
+    revenue_this_month = await db.scalar(select(func.sum(Payment.amount)).where(
         and_(
             Payment.payment_status == "completed",
             Payment.payment_date >= this_month_start
         )
-    ).scalar() or 0.0
+    )) or 0.0
     
     return AdminStats(
         total_users=total_users,
@@ -121,43 +128,50 @@ async def get_admin_stats(
 
 @admin_router.get("/users", response_model=List[UserAdmin])
 async def get_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     search: Optional[str] = None,
     role: Optional[str] = None,
     city: Optional[str] = None,
+    cursor: Optional[str] = CursorQuery,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(User)
+    query = select(User)
     
     # Apply filters
     if search:
-        query = query.filter(
+        query = query.where(
             or_(
-                User.full_name.ilike(f"%{search}%"),
-                User.email.ilike(f"%{search}%")
+                folded_prefix(User.full_name_folded, search),
+                folded_prefix(User.email_folded, search)
             )
         )
     
     if role:
-        query = query.filter(User.role == role)
+        query = query.where(User.role == role)
     
     if city:
-        query = query.filter(User.city.ilike(f"%{city}%"))
+        query = query.where(folded_equals(User.city_folded, city))
     
-    users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor is None:
+        users = (await db.scalars(query.order_by(User.created_at.desc()).offset(skip).limit(limit))).all()
+    else:
+        keys = [User.created_at, User.id]
+        users = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        users = finish_keyset_page(users, keys, limit, response)
     
     # Get additional stats for each user
     result = []
     for user in users:
-        total_enrollments = db.query(Enrollment).filter(Enrollment.student_id == user.id).count()
-        total_spent = db.query(func.sum(Payment.amount)).filter(
+        total_enrollments = await db.scalar(select(func.count(Enrollment.id)).where(Enrollment.student_id == user.id))
+        total_spent = await db.scalar(select(func.sum(Payment.amount)).where(
             and_(
                 Payment.user_id == user.id,
                 Payment.payment_status == "completed"
             )
-        ).scalar() or 0.0
+        )) or 0.0
         
         user_admin = UserAdmin(
             id=user.id,
@@ -178,48 +192,56 @@ async def get_users(
 
 @admin_router.get("/instructors", response_model=List[InstructorAdmin])
 async def get_instructors(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     is_approved: Optional[bool] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = CursorQuery,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(Instructor)
+    query = select(Instructor)
     
     # Apply filters
     if is_approved is not None:
-        query = query.filter(Instructor.is_approved == is_approved)
+        query = query.where(Instructor.is_approved == is_approved)
     
     if search:
-        query = query.join(User).filter(
+        query = query.join(User).where(
             or_(
-                User.full_name.ilike(f"%{search}%"),
-                Instructor.specialization.ilike(f"%{search}%")
+                folded_prefix(User.full_name_folded, search),
+                folded_prefix(Instructor.specialization_folded, search)
             )
         )
     
-    instructors = query.order_by(Instructor.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor is None:
+        instructors = (await db.scalars(query.order_by(Instructor.created_at.desc()).offset(skip).limit(limit))).all()
+    else:
+        keys = [Instructor.created_at, Instructor.id]
+        instructors = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        instructors = finish_keyset_page(instructors, keys, limit, response)
     
     # Get additional stats for each instructor
     result = []
     for instructor in instructors:
-        total_courses = db.query(Course).filter(Course.instructor_id == instructor.id).count()
+        total_courses = await db.scalar(select(func.count(Course.id)).where(Course.instructor_id == instructor.id))
         
         # Calculate total revenue for instructor
-        total_revenue = db.query(func.sum(Payment.amount)).join(Course).filter(
+        total_revenue = await db.scalar(select(func.sum(Payment.amount)).join(Course, Payment.course_id == Course.id).where(
             and_(
                 Course.instructor_id == instructor.id,
                 Payment.payment_status == "completed"
             )
-        ).scalar() or 0.0
+        )) or 0.0
         
+        user = await instructor.awaitable_attrs.user
         user_info = {
-            "id": instructor.user.id,
-            "email": instructor.user.email,
-            "full_name": instructor.user.full_name,
-            "city": instructor.user.city,
-            "district": instructor.user.district
+            "id": user.id,
+            "email": user.email,
+            "full_name": user.full_name,
+            "city": user.city,
+            "district": user.district
         }
         
         instructor_admin = InstructorAdmin(
@@ -243,9 +265,9 @@ async def get_instructors(
 async def approve_instructor(
     instructor_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = db.query(Instructor).filter(Instructor.id == instructor_id).first()
+    instructor = await db.scalar(select(Instructor).where(Instructor.id == instructor_id))
     
     if not instructor:
         raise HTTPException(
@@ -254,7 +276,10 @@ async def approve_instructor(
         )
     
     instructor.is_approved = True
-    db.commit()
+    await db.commit()
+    facets_cache.clear()
+    instructor_user = await instructor.awaitable_attrs.user
+    suggest_index.update_instructor(instructor, instructor_user.full_name)
     
     return {"message": "Instructor approved successfully"}
 
@@ -262,9 +287,9 @@ async def approve_instructor(
 async def reject_instructor(
     instructor_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = db.query(Instructor).filter(Instructor.id == instructor_id).first()
+    instructor = await db.scalar(select(Instructor).where(Instructor.id == instructor_id))
     
     if not instructor:
         raise HTTPException(
@@ -273,54 +298,65 @@ async def reject_instructor(
         )
     
     instructor.is_approved = False
-    db.commit()
+    await db.commit()
+    facets_cache.clear()
+    suggest_index.update_instructor(instructor, None)
     
     return {"message": "Instructor rejected"}
 
 @admin_router.get("/courses", response_model=List[CourseAdmin])
 async def get_courses(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     category: Optional[str] = None,
     is_published: Optional[bool] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = CursorQuery,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(Course)
+    query = select(Course)
     
     # Apply filters
     if category:
-        query = query.filter(Course.category == category)
+        query = query.where(Course.category == category)
     
     if is_published is not None:
-        query = query.filter(Course.is_published == is_published)
+        query = query.where(Course.is_published == is_published)
     
     if search:
-        query = query.filter(
-            or_(
-                Course.title.ilike(f"%{search}%"),
-                Course.description.ilike(f"%{search}%")
-            )
-        )
-    
-    courses = query.order_by(Course.created_at.desc()).offset(skip).limit(limit).all()
+        # Folded title prefix (Turkish-insensitive), or the full-text index
+        # over title, description and category for term prefixes
+        query = query.where(or_(
+            folded_prefix(Course.title_folded, search),
+            Course.id.in_(apply_course_search(select(Course.id), search, ranked=False))
+        ))
+    
+    if cursor is None:
+        courses = (await db.scalars(query.order_by(Course.created_at.desc()).offset(skip).limit(limit))).all()
+    else:
+        keys = [Course.created_at, Course.id]
+        courses = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        courses = finish_keyset_page(courses, keys, limit, response)
     
     # Get additional stats for each course
     result = []
     for course in courses:
         # Calculate total revenue for course
-        total_revenue = db.query(func.sum(Payment.amount)).filter(
+        total_revenue = await db.scalar(select(func.sum(Payment.amount)).where(
             and_(
                 Payment.course_id == course.id,
                 Payment.payment_status == "completed"
             )
-        ).scalar() or 0.0
+        )) or 0.0
         
+        instructor = await course.awaitable_attrs.instructor
+        instructor_user = await instructor.awaitable_attrs.user
         course_admin = CourseAdmin(
             id=course.id,
             title=course.title,
-            instructor_name=course.instructor.user.full_name,
+            instructor_name=instructor_user.full_name,
             category=course.category,
             price=course.price,
             enrollment_count=course.enrollment_count,
@@ -337,9 +373,9 @@ async def get_courses(
 async def publish_course(
     course_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     
     if not course:
         raise HTTPException(
@@ -348,7 +384,10 @@ async def publish_course(
         )
     
     course.is_published = True
-    db.commit()
+    await db.commit()
+    course_cache.invalidate(course.id)
+    facets_cache.clear()
+    suggest_index.update_course(course)
     
     return {"message": "Course published successfully"}
 
@@ -356,9 +395,9 @@ async def publish_course(
 async def unpublish_course(
     course_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     
     if not course:
         raise HTTPException(
@@ -367,7 +406,10 @@ async def unpublish_course(
         )
     
     course.is_published = False
-    db.commit()
+    await db.commit()
+    course_cache.invalidate(course.id)
+    facets_cache.clear()
+    suggest_index.update_course(course)
     
     return {"message": "Course unpublished"}
 
@@ -375,9 +417,9 @@ async def unpublish_course(
 async def activate_user(
     user_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     
     if not user:
         raise HTTPException(
@@ -386,7 +428,7 @@ async def activate_user(
         )
     
     user.is_active = True
-    db.commit()
+    await db.commit()
     
     return {"message": "User activated successfully"}
 
@@ -394,9 +436,9 @@ async def activate_user(
 async def deactivate_user(
     user_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     
     if not user:
         raise HTTPException(
@@ -411,7 +453,7 @@ async def deactivate_user(
         )
     
     user.is_active = False
-    db.commit()
+    await db.commit()
     
     return {"message": "User deactivated"}
 
@@ -419,31 +461,31 @@ async def deactivate_user(
 async def get_revenue_analytics(
     days: int = Query(30, ge=1, le=365),
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     start_date = datetime.utcnow() - timedelta(days=days)
     
     # Daily revenue
-    daily_revenue = db.query(
+    daily_revenue = (await db.execute(select(
         func.date(Payment.payment_date).label('date'),
         func.sum(Payment.amount).label('revenue')
-    ).filter(
+    ).where(
         and_(
             Payment.payment_status == "completed",
             Payment.payment_date >= start_date
         )
-    ).group_by(func.date(Payment.payment_date)).all()
+    ).group_by(func.date(Payment.payment_date)))).all()
     
     # Revenue by category
-    category_revenue = db.query(
+    category_revenue = (await db.execute(select(
         Course.category,
         func.sum(Payment.amount).label('revenue')
-    ).join(Payment).filter(
+    ).join(Payment, Payment.course_id == Course.id).where(
         and_(
             Payment.payment_status == "completed",
             Payment.payment_date >= start_date
         )
-    ).group_by(Course.category).all()
+    ).group_by(Course.category))).all()
     
     return {
         "period_days": days,
@@ -461,28 +503,28 @@ async def get_revenue_analytics(
 async def get_user_analytics(
     days: int = Query(30, ge=1, le=365),
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     start_date = datetime.utcnow() - timedelta(days=days)
     
     # Daily user registrations
-    daily_registrations = db.query(
+    daily_registrations = (await db.execute(select(
         func.date(User.created_at).label('date'),
         func.count(User.id).label('registrations')
-    ).filter(
+    ).where(
         User.created_at >= start_date
-    ).group_by(func.date(User.created_at)).all()
+    ).group_by(func.date(User.created_at)))).all()
     
     # Users by city
-    users_by_city = db.query(
+    users_by_city = (await db.execute(select(
         User.city,
         func.count(User.id).label('count')
-    ).filter(
+    ).where(
         and_(
             User.city.isnot(None),
             User.created_at >= start_date
         )
-    ).group_by(User.city).order_by(func.count(User.id).desc()).limit(10).all()
+    ).group_by(User.city).order_by(func.count(User.id).desc()).limit(10))).all()
     
     return {
         "period_days": days,
@@ -496,36 +538,82 @@ async def get_user_analytics(
         ]
     }
 
+@admin_router.get("/database/pool")
+async def get_database_pool_stats(
+    admin_user: User = Depends(require_admin)
+):
+    return {
+        "primary": pool_status(engine),
+        "sqlite_readers": pool_status(reader_engine) if reader_engine is not None else None,
+        "replicas": [pool_status(replica) for replica in replica_engines]
+    }
+
+@admin_router.get("/cache")
+async def get_cache_stats(
+    admin_user: User = Depends(require_admin)
+):
+    return {
+        "course_detail": course_cache.stats(),
+        "facets": facets_cache.stats(),
+        "suggest": suggest_index.stats()
+    }
+
+@admin_router.post("/counters/reconcile")
+async def reconcile_counters(
+    admin_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    # Recompute enrollment counters from Enrollment; also runs periodically
+    return await reconcile_enrollment_counters(db)
+
+@admin_router.post("/ratings/recompute")
+async def recompute_all_ratings(
+    admin_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    # Rebuild course and instructor ratings from Review; also runs periodically
+    return await recompute_ratings(db)
+
 @admin_router.get("/reviews/pending")
 async def get_pending_reviews(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = CursorQuery,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    reviews = db.query(Review).filter(
-        Review.is_approved == False
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+    query = select(Review).where(Review.is_approved == False)
+    if cursor is None:
+        reviews = (await db.scalars(query.order_by(Review.created_at.desc()).offset(skip).limit(limit))).all()
+    else:
+        keys = [Review.created_at, Review.id]
+        reviews = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        reviews = finish_keyset_page(reviews, keys, limit, response)
     
     result = []
     for review in reviews:
+        reviewer = await review.awaitable_attrs.reviewer
+        course = await review.awaitable_attrs.course
+        instructor = await review.awaitable_attrs.instructor
+        instructor_user = await instructor.awaitable_attrs.user if instructor else None
         review_dict = {
             "id": review.id,
             "rating": review.rating,
             "comment": review.comment,
             "created_at": review.created_at,
             "reviewer": {
-                "id": review.reviewer.id,
-                "full_name": review.reviewer.full_name
+                "id": reviewer.id,
+                "full_name": reviewer.full_name
             },
             "course": {
-                "id": review.course.id,
-                "title": review.course.title
-            } if review.course else None,
+                "id": course.id,
+                "title": course.title
+            } if course else None,
             "instructor": {
-                "id": review.instructor.id,
-                "name": review.instructor.user.full_name
-            } if review.instructor else None
+                "id": instructor.id,
+                "name": instructor_user.full_name
+            } if instructor else None
         }
         result.append(review_dict)
     
@@ -535,9 +623,9 @@ async def get_pending_reviews(
 async def approve_review(
     review_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.scalar(select(Review).where(Review.id == review_id))
     
     if not review:
         raise HTTPException(
@@ -545,8 +633,18 @@ async def approve_review(
             detail="Review not found"
         )
     
-    review.is_approved = True
-    db.commit()
+    # Conditional UPDATE: of two concurrent approvals only one flips the row,
+    # so the rating is counted once
+    approved = await db.execute(
+        update(Review)
+        .where(Review.id == review_id, Review.is_approved.isnot(True))
+        .values(is_approved=True)
+        .execution_options(synchronize_session=False)
+    )
+    if approved.rowcount == 1:
+        await count_review(db, review)
+    await db.commit()
+    course_cache.invalidate(review.course_id)
     
     return {"message": "Review approved successfully"}
 
@@ -554,9 +652,16 @@ async def approve_review(
 async def delete_review(
     review_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    review = db.query(Review).filter(Review.id == review_id).first()
+    # DELETE ... RETURNING: only the request that actually removed the row
+    # sees it, so concurrent deletes never subtract the rating twice
+    review = (await db.execute(
+        delete(Review)
+        .where(Review.id == review_id)
+        .returning(Review.course_id, Review.instructor_id, Review.rating, Review.is_approved)
+        .execution_options(synchronize_session=False)
+    )).first()
     
     if not review:
         raise HTTPException(
@@ -564,7 +669,11 @@ async def delete_review(
             detail="Review not found"
         )
     
-    db.delete(review)
-    db.commit()
+    # Take its contribution back out of the course and instructor ratings
+    if review.is_approved:
+        await count_review(db, review, -1)
+    
+    await db.commit()
+    course_cache.invalidate(review.course_id)
     
     return {"message": "Review deleted successfully"}
\ No newline at end of file
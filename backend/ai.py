@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional
 import openai
@@ -223,8 +224,8 @@ class GeminiService:
             )
 
 # Helper functions
-def get_user_learning_context(user: User, db: Session) -> str:
-    enrollments = db.query(Enrollment).filter(Enrollment.student_id == user.id).all()
+async def get_user_learning_context(user: User, db: AsyncSession) -> str:
+    enrollments = (await db.scalars(select(Enrollment).where(Enrollment.student_id == user.id))).all()
     
     context_parts = []
     context_parts.append(f"Kullanıcı: {user.full_name}")
@@ -234,11 +235,12 @@ def get_user_learning_context(user: User, db: Session) -> str:
         context_parts.append("Aktif kurslar:")
         for enrollment in enrollments[:3]:  # Son 3 kursu göster
             progress = f"{enrollment.progress_percentage:.1f}%"
-            context_parts.append(f"- {enrollment.course.title} (İlerleme: {progress})")
+            course = await enrollment.awaitable_attrs.course
+            context_parts.append(f"- {course.title} (İlerleme: {progress})")
     
     return "\n".join(context_parts)
 
-def save_ai_interaction(user_id: int, interaction_type: str, input_data: dict, output_data: dict, model_used: str, db: Session):
+async def save_ai_interaction(user_id: int, interaction_type: str, input_data: dict, output_data: dict, model_used: str, db: AsyncSession):
     ai_interaction = AIInteraction(
         user_id=user_id,
         interaction_type=interaction_type,
@@ -247,17 +249,17 @@ def save_ai_interaction(user_id: int, interaction_type: str, input_data: dict, o
         model_used=model_used
     )
     db.add(ai_interaction)
-    db.commit()
+    await db.commit()
 
 # Routes
 @ai_router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(
     chat_message: ChatMessage,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Get user context
-    user_context = get_user_learning_context(current_user, db)
+    user_context = await get_user_learning_context(current_user, db)
     full_context = f"{user_context}\n{chat_message.context or ''}"
     
     # Try Gemini first, fallback to OpenAI
@@ -275,7 +277,7 @@ async def chat_with_ai(
             )
     
     # Save interaction
-    save_ai_interaction(
+    await save_ai_interaction(
         user_id=current_user.id,
         interaction_type="chat",
         input_data={"message": chat_message.message, "context": chat_message.context},
@@ -290,13 +292,13 @@ async def chat_with_ai(
 async def generate_quiz(
     quiz_request: QuizRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if user is enrolled in the course
-    enrollment = db.query(Enrollment).filter(
+    enrollment = await db.scalar(select(Enrollment).where(
         Enrollment.student_id == current_user.id,
         Enrollment.course_id == quiz_request.course_id
-    ).first()
+    ))
     
     if not enrollment:
         raise HTTPException(
@@ -305,7 +307,7 @@ async def generate_quiz(
         )
     
     # Get course for context
-    course = db.query(Course).filter(Course.id == quiz_request.course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == quiz_request.course_id))
     topic_with_context = f"{course.title} - {quiz_request.topic}"
     
     # Try Gemini first, fallback to OpenAI
@@ -331,7 +333,7 @@ async def generate_quiz(
             )
     
     # Save interaction
-    save_ai_interaction(
+    await save_ai_interaction(
         user_id=current_user.id,
         interaction_type="quiz",
         input_data=quiz_request.dict(),
@@ -346,13 +348,13 @@ async def generate_quiz(
 async def generate_study_plan(
     study_request: StudyPlanRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if user is enrolled in the course
-    enrollment = db.query(Enrollment).filter(
+    enrollment = await db.scalar(select(Enrollment).where(
         Enrollment.student_id == current_user.id,
         Enrollment.course_id == study_request.course_id
-    ).first()
+    ))
     
     if not enrollment:
         raise HTTPException(
@@ -360,15 +362,15 @@ async def generate_study_plan(
             detail="You must be enrolled in this course to generate study plans"
         )
     
-    course = db.query(Course).filter(Course.id == study_request.course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == study_request.course_id))
     
     # Get user's progress
-    completed_lessons = db.query(LessonProgress).filter(
+    completed_lessons = await db.scalar(select(func.count(LessonProgress.id)).where(
         LessonProgress.enrollment_id == enrollment.id,
         LessonProgress.is_completed == True
-    ).count()
+    ))
     
-    total_lessons = len(course.lessons)
+    total_lessons = len(await course.awaitable_attrs.lessons)
     
     # Create study plan
     plan = {
@@ -407,7 +409,7 @@ async def generate_study_plan(
         )
     
     # Save interaction
-    save_ai_interaction(
+    await save_ai_interaction(
         user_id=current_user.id,
         interaction_type="study_plan",
         input_data=study_request.dict(),
@@ -421,16 +423,16 @@ async def generate_study_plan(
 @ai_router.get("/recommendations")
 async def get_personalized_recommendations(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Get user's enrollments and progress
-    enrollments = db.query(Enrollment).filter(Enrollment.student_id == current_user.id).all()
+    enrollments = (await db.scalars(select(Enrollment).where(Enrollment.student_id == current_user.id))).all()
     
     if not enrollments:
         # New user recommendations
-        popular_courses = db.query(Course).filter(
+        popular_courses = (await db.scalars(select(Course).where(
             Course.is_published == True
-        ).order_by(Course.enrollment_count.desc()).limit(5).all()
+        ).order_by(Course.enrollment_count.desc()).limit(5))).all()
         
         return {
             "type": "new_user",
@@ -453,14 +455,14 @@ async def get_personalized_recommendations(
     in_progress_courses = [e for e in enrollments if not e.completed_at]
     
     # Get categories user is interested in
-    user_categories = list(set([e.course.category for e in enrollments]))
+    user_categories = list(set([(await e.awaitable_attrs.course).category for e in enrollments]))
     
     # Find similar courses
-    recommended_courses = db.query(Course).filter(
+    recommended_courses = (await db.scalars(select(Course).where(
         Course.is_published == True,
         Course.category.in_(user_categories),
         ~Course.id.in_([e.course_id for e in enrollments])
-    ).order_by(Course.rating.desc()).limit(5).all()
+    ).order_by(Course.rating.desc()).limit(5))).all()
     
     recommendations = []
     for course in recommended_courses:
@@ -488,11 +490,11 @@ async def get_personalized_recommendations(
 @ai_router.get("/my-interactions")
 async def get_my_ai_interactions(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    interactions = db.query(AIInteraction).filter(
+    interactions = (await db.scalars(select(AIInteraction).where(
         AIInteraction.user_id == current_user.id
-    ).order_by(AIInteraction.created_at.desc()).limit(10).all()
+    ).order_by(AIInteraction.created_at.desc()).limit(10))).all()
     
     return [
         {
@@ -0,0 +1,57 @@
+"""catalog filter, keyset pagination and hot foreign key indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns); tables themselves are created by the app on startup
+INDEXES = [
+    # Keyset pagination (sort column, id)
+    ("ix_users_created_at_id", "users", ["created_at", "id"]),
+    ("ix_instructors_approved_rating_students_id", "instructors", ["is_approved", "rating", "total_students", "id"]),
+    ("ix_instructors_created_at_id", "instructors", ["created_at", "id"]),
+    ("ix_courses_published_created_at_id", "courses", ["is_published", "created_at", "id"]),
+    ("ix_courses_created_at_id", "courses", ["created_at", "id"]),
+    ("ix_reviews_instructor_approved_created_at_id", "reviews", ["instructor_id", "is_approved", "created_at", "id"]),
+    ("ix_reviews_approved_created_at_id", "reviews", ["is_approved", "created_at", "id"]),
+    # Catalog filters
+    ("ix_courses_published_category_price", "courses", ["is_published", "category", "price"]),
+    ("ix_courses_published_level_price", "courses", ["is_published", "level", "price"]),
+    ("ix_courses_published_online_price", "courses", ["is_published", "is_online", "price"]),
+    ("ix_courses_published_price", "courses", ["is_published", "price"]),
+    ("ix_courses_instructor_published", "courses", ["instructor_id", "is_published"]),
+    # Hot foreign keys
+    ("ix_lessons_course_order", "lessons", ["course_id", "order_index"]),
+    ("ix_enrollments_student_course", "enrollments", ["student_id", "course_id"]),
+    ("ix_enrollments_course_id", "enrollments", ["course_id"]),
+    ("ix_lesson_progress_enrollment_completed", "lesson_progress", ["enrollment_id", "is_completed"]),
+    ("ix_reviews_reviewer_course", "reviews", ["reviewer_id", "course_id"]),
+    ("ix_reviews_course_approved", "reviews", ["course_id", "is_approved"]),
+    ("ix_payments_user_course_status", "payments", ["user_id", "course_id", "payment_status"]),
+    ("ix_payments_course_status", "payments", ["course_id", "payment_status"]),
+    ("ix_payments_status_date", "payments", ["payment_status", "payment_date"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
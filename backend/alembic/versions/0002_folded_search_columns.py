@@ -0,0 +1,79 @@
+"""turkish-folded search shadow columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from normalize import fold_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> {shadow column: source column}
+FOLDED_COLUMNS = {
+    "users": {"full_name_folded": "full_name", "city_folded": "city", "district_folded": "district"},
+    "instructors": {"specialization_folded": "specialization"},
+    "courses": {"title_folded": "title", "location_folded": "location"},
+}
+
+# (index name, table, columns, prefix-matched columns)
+INDEXES = [
+    ("ix_users_full_name_folded", "users", ["full_name_folded"], ["full_name_folded"]),
+    ("ix_users_city_district_folded", "users", ["city_folded", "district_folded"], []),
+    ("ix_instructors_specialization_folded", "instructors", ["specialization_folded"], ["specialization_folded"]),
+    ("ix_courses_title_folded", "courses", ["title_folded"], ["title_folded"]),
+    ("ix_courses_location_folded", "courses", ["location_folded"], ["location_folded"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table, columns in FOLDED_COLUMNS.items():
+        # Databases created by the app's create_all already have them
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for shadow in columns:
+            if shadow not in existing:
+                op.add_column(table, sa.Column(shadow, sa.String(), nullable=True))
+
+        # Backfill with the same folding the models apply on write
+        sources = list(columns.values())
+        rows = bind.execute(sa.text(f"SELECT id, {', '.join(sources)} FROM {table}")).all()
+        if rows:
+            assignments = ", ".join(f"{shadow} = :{shadow}" for shadow in columns)
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {assignments} WHERE id = :id"),
+                [
+                    {"id": row[0], **{shadow: fold_text(value) for shadow, value in zip(columns, row[1:])}}
+                    for row in rows
+                ]
+            )
+
+    for name, table, columns, prefix_columns in INDEXES:
+        op.create_index(
+            name, table, columns, if_not_exists=True,
+            postgresql_ops={column: "text_pattern_ops" for column in prefix_columns}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns, prefix_columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+
+    for table, columns in FOLDED_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for shadow in columns:
+                batch_op.drop_column(shadow)
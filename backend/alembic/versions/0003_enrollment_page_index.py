@@ -0,0 +1,31 @@
+"""student enrollment page index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # My-courses pages: a student's enrollments, newest first (keyset on enrolled_at, id)
+    op.create_index(
+        "ix_enrollments_student_enrolled_at_id", "enrollments", ["student_id", "enrolled_at", "id"],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_enrollments_student_enrolled_at_id", table_name="enrollments", if_exists=True)
@@ -0,0 +1,63 @@
+"""exact rating sums and rating recompute indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> reviews column pointing at it
+RATED_TABLES = {"courses": "course_id", "instructors": "instructor_id"}
+
+INDEXES = [
+    ("ix_reviews_approved_course_rating", "reviews", ["is_approved", "course_id", "rating"]),
+    ("ix_reviews_approved_instructor_rating", "reviews", ["is_approved", "instructor_id", "rating"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table, review_column in RATED_TABLES.items():
+        # Databases created by the app's create_all already have it
+        if "rating_sum" not in {column["name"] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column("rating_sum", sa.Integer(), nullable=True, server_default="0"))
+
+        # Rebuild sum, count and average from the approved reviews, replacing
+        # the running averages kept so far
+        approved = f"FROM reviews WHERE reviews.{review_column} = {table}.id AND reviews.is_approved = TRUE"
+        bind.execute(sa.text(
+            f"UPDATE {table} SET "
+            f"rating_sum = COALESCE((SELECT SUM(rating) {approved}), 0), "
+            f"total_ratings = (SELECT COUNT(*) {approved})"
+        ))
+        bind.execute(sa.text(
+            f"UPDATE {table} SET rating = CASE WHEN total_ratings > 0 "
+            f"THEN ROUND(CAST(rating_sum * 1.0 / total_ratings AS NUMERIC), 2) ELSE 0 END"
+        ))
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+
+    for table in RATED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("rating_sum")
@@ -0,0 +1,32 @@
+"""course thumbnail variants
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by the app's create_all already have it
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("courses")}
+    if "thumbnail_variants" not in columns:
+        op.add_column("courses", sa.Column("thumbnail_variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("courses") as batch_op:
+        batch_op.drop_column("thumbnail_variants")
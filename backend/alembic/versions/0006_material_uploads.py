@@ -0,0 +1,52 @@
+"""resumable material uploads
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Materials over 2 GiB overflow a 32-bit integer on PostgreSQL
+    with op.batch_alter_table("course_materials") as batch_op:
+        batch_op.alter_column("file_size", type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=True)
+
+    # Databases created by the app's create_all already have it
+    if not sa.inspect(op.get_bind()).has_table("material_uploads"):
+        op.create_table(
+            "material_uploads",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("extension", sa.String(), nullable=False),
+            sa.Column("total_size", sa.BigInteger(), nullable=False),
+            sa.Column("chunk_size", sa.Integer(), nullable=False),
+            sa.Column("checksum", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_material_uploads_expires_at", "material_uploads", ["expires_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_material_uploads_expires_at", table_name="material_uploads")
+    op.drop_table("material_uploads")
+    with op.batch_alter_table("course_materials") as batch_op:
+        batch_op.alter_column("file_size", type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=True)
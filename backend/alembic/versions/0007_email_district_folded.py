@@ -0,0 +1,64 @@
+"""folded email and course district search columns
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from normalize import fold_text, folded_district
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (shadow column, source column, folding)
+FOLDED_COLUMNS = {
+    "users": ("email_folded", "email", fold_text),
+    "courses": ("district_folded", "location", lambda value: folded_district(fold_text(value))),
+}
+
+# (index name, table, column); all prefix-matched
+INDEXES = [
+    ("ix_users_email_folded", "users", "email_folded"),
+    ("ix_courses_district_folded", "courses", "district_folded"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table, (shadow, source, fold) in FOLDED_COLUMNS.items():
+        # Databases created by the app's create_all already have them
+        if shadow not in {column["name"] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column(shadow, sa.String(), nullable=True))
+
+        # Backfill with the same folding the models apply on write
+        rows = bind.execute(sa.text(f"SELECT id, {source} FROM {table}")).all()
+        if rows:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {shadow} = :value WHERE id = :id"),
+                [{"id": row[0], "value": fold(row[1])} for row in rows]
+            )
+
+    for name, table, column in INDEXES:
+        op.create_index(name, table, [column], if_not_exists=True, postgresql_ops={column: "text_pattern_ops"})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, column in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+
+    for table, (shadow, source, fold) in FOLDED_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(shadow)
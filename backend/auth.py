@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
@@ -12,7 +13,9 @@ import string
 from twilio.rest import Client
 
 from database import get_db
-from models import User, OTPVerification
+from models import User, OTPVerification, Instructor, Course
+from suggest import suggest_index
+from cache import course_cache
 
 auth_router = APIRouter()
 security = HTTPBearer()
@@ -83,7 +86,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 def generate_otp() -> str:
     return ''.join(random.choices(string.digits, k=6))
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = payload.get("sub")
@@ -100,7 +103,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == int(user_id)))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,7 +114,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
 # Routes
 @auth_router.post("/send-otp")
-async def send_otp(otp_request: OTPRequest, db: Session = Depends(get_db)):
+async def send_otp(otp_request: OTPRequest, db: AsyncSession = Depends(get_db)):
     # Generate OTP
     otp_code = generate_otp()
     expires_at = datetime.utcnow() + timedelta(minutes=5)
@@ -123,7 +126,7 @@ async def send_otp(otp_request: OTPRequest, db: Session = Depends(get_db)):
         expires_at=expires_at
     )
     db.add(otp_record)
-    db.commit()
+    await db.commit()
     
     # Send SMS (if Twilio is configured)
     if twilio_client:
@@ -142,14 +145,14 @@ async def send_otp(otp_request: OTPRequest, db: Session = Depends(get_db)):
         return {"message": "OTP generated (development mode)", "otp": otp_code}
 
 @auth_router.post("/verify-otp")
-async def verify_otp(otp_verify: OTPVerify, db: Session = Depends(get_db)):
+async def verify_otp(otp_verify: OTPVerify, db: AsyncSession = Depends(get_db)):
     # Find OTP record
-    otp_record = db.query(OTPVerification).filter(
+    otp_record = await db.scalar(select(OTPVerification).where(
         OTPVerification.phone == otp_verify.phone,
         OTPVerification.otp_code == otp_verify.otp_code,
         OTPVerification.is_verified == False,
         OTPVerification.expires_at > datetime.utcnow()
-    ).first()
+    ))
     
     if not otp_record:
         raise HTTPException(
@@ -159,16 +162,16 @@ async def verify_otp(otp_verify: OTPVerify, db: Session = Depends(get_db)):
     
     # Mark as verified
     otp_record.is_verified = True
-    db.commit()
+    await db.commit()
     
     return {"message": "OTP verified successfully"}
 
 @auth_router.post("/register", response_model=UserResponse)
-async def register(user_create: UserCreate, db: Session = Depends(get_db)):
+async def register(user_create: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         (User.email == user_create.email) | (User.phone == user_create.phone)
-    ).first()
+    ))
     
     if existing_user:
         raise HTTPException(
@@ -177,10 +180,10 @@ async def register(user_create: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Verify OTP for phone number
-    verified_otp = db.query(OTPVerification).filter(
+    verified_otp = await db.scalar(select(OTPVerification).where(
         OTPVerification.phone == user_create.phone,
         OTPVerification.is_verified == True
-    ).first()
+    ))
     
     if not verified_otp:
         raise HTTPException(
@@ -201,15 +204,15 @@ async def register(user_create: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
 @auth_router.post("/login")
-async def login(user_login: UserLogin, db: Session = Depends(get_db)):
+async def login(user_login: UserLogin, db: AsyncSession = Depends(get_db)):
     # Find user
-    user = db.query(User).filter(User.email == user_login.email).first()
+    user = await db.scalar(select(User).where(User.email == user_login.email))
     
     if not user or not verify_password(user_login.password, user.password_hash):
         raise HTTPException(
@@ -245,7 +248,7 @@ async def update_profile(
     city: Optional[str] = None,
     district: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if full_name:
         current_user.full_name = full_name
@@ -255,7 +258,15 @@ async def update_profile(
         current_user.district = district
     
     current_user.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    
+    if full_name:
+        instructor = await db.scalar(select(Instructor).where(Instructor.user_id == current_user.id))
+        if instructor:
+            suggest_index.update_instructor(instructor, current_user.full_name)
+            # Course detail payloads embed the instructor's name
+            course_ids = (await db.scalars(select(Course.id).where(Course.instructor_id == instructor.id))).all()
+            course_cache.invalidate(*course_ids)
     
     return current_user
\ No newline at end of file
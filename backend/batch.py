@@ -0,0 +1,25 @@
+from fastapi import HTTPException, Query, status
+from decouple import config
+
+# Batch reads: `ids=3,1,7` resolves many rows in one request and one IN
+# query. Results follow the requested order; missing or unpublished ids are
+# left out rather than failing the whole batch.
+BATCH_MAX_IDS = config("BATCH_MAX_IDS", default=100, cast=int)
+
+def batch_ids(ids: str = Query(..., description="Comma-separated ids, e.g. 3,1,7")) -> list:
+    try:
+        values = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers"
+        )
+
+    # Duplicates dropped, first occurrence kept
+    values = list(dict.fromkeys(values))
+    if not values or len(values) > BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {BATCH_MAX_IDS} ids"
+        )
+    return values
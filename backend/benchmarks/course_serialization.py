@@ -0,0 +1,86 @@
+"""Microbenchmark: course response serialization.
+
+Compares the old handler path (a CourseResponse built from the instance dict,
+then revalidated against response_model and rendered by JSONResponse) with
+course_row + dump_json, on in-memory rows. No database needed:
+
+    cd backend && python benchmarks/course_serialization.py [--rows 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from courses import CourseResponse, course_row
+from models import Course, Instructor, User
+from serialization import dump_json
+
+def make_courses(count: int) -> list:
+    user = User(id=1, full_name="Ayşe Yılmaz", updated_at=datetime(2026, 1, 1))
+    instructor = Instructor(
+        id=1, user=user, bio="Matematik öğretmeni", rating=4.7,
+        total_students=320, experience_years=12
+    )
+    return [
+        Course(
+            id=course_id, title=f"Kurs {course_id}", description="Açıklama " * 20,
+            short_description="Kısa açıklama", price=499.0, discount_price=None,
+            duration_hours=24, level="beginner", category="Matematik", subcategory=None,
+            language="tr", thumbnail=None, thumbnail_variants=None, preview_video=None,
+            location="Kadıköy, İstanbul", latitude=40.99, longitude=29.03,
+            is_online=False, is_published=True, enrollment_count=42, rating=4.5,
+            total_ratings=10, created_at=datetime(2026, 1, 1), updated_at=datetime(2026, 1, 1),
+            instructor=instructor
+        )
+        for course_id in range(1, count + 1)
+    ]
+
+response_field = create_model_field(name="Response_get_courses", type_=List[CourseResponse], mode="serialization")
+loop = asyncio.new_event_loop()
+
+def old_path(courses: list) -> bytes:
+    result = []
+    for course in courses:
+        instructor = course.instructor
+        instructor_info = {
+            "id": instructor.id,
+            "name": instructor.user.full_name,
+            "bio": instructor.bio,
+            "rating": instructor.rating,
+            "total_students": instructor.total_students,
+            "experience_years": instructor.experience_years
+        }
+        result.append(CourseResponse(**{**course.__dict__, "instructor": instructor_info}))
+    content = loop.run_until_complete(serialize_response(field=response_field, response_content=result))
+    return JSONResponse(content).body
+
+def new_path(courses: list) -> bytes:
+    return dump_json(List[CourseResponse], [course_row(course) for course in courses])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+    
+    courses = make_courses(args.rows)
+    assert json.loads(old_path(courses)) == json.loads(new_path(courses))
+    timings = {}
+    for name, path in (("response_model", old_path), ("course_row", new_path)):
+        best = min(timeit.repeat(lambda: path(courses), number=args.number, repeat=5))
+        timings[name] = best / args.number
+        print(f"{name:>14}: {timings[name] * 1e3:8.3f} ms/page  {timings[name] / args.rows * 1e6:7.2f} us/row")
+    print(f"{'speedup':>14}: {timings['response_model'] / timings['course_row']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from decouple import config
+import time
+
+COURSE_CACHE_SIZE = config("COURSE_CACHE_SIZE", default=1024, cast=int)
+COURSE_CACHE_TTL = config("COURSE_CACHE_TTL", default=60, cast=float)  # seconds
+FACETS_CACHE_TTL = config("FACETS_CACHE_TTL", default=300, cast=float)  # seconds
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Readers take a `token()` before querying the database and pass it to
+    `set()`; if anything was invalidated in between, the (possibly stale)
+    value is not stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def token(self) -> int:
+        return self._generation
+
+    def set(self, key, value, token: int = None):
+        if self.maxsize <= 0 or (token is not None and token != self._generation):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys):
+        self._generation += 1
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Serialized GET /api/courses/{course_id} payloads, keyed by course id
+course_cache = TTLCache(maxsize=COURSE_CACHE_SIZE, ttl=COURSE_CACHE_TTL)
+
+# Serialized GET /api/courses/facets payload (single entry)
+FACETS_KEY = "catalog"
+facets_cache = TTLCache(maxsize=1, ttl=FACETS_CACHE_TTL)
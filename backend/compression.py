@@ -0,0 +1,141 @@
+from starlette.datastructures import Headers, MutableHeaders
+from decouple import config
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Response compression negotiated from Accept-Encoding (br preferred, then
+# gzip), applied only to compressible content types above a minimum size
+COMPRESSION_MINIMUM_SIZE = config("COMPRESSION_MINIMUM_SIZE", default=1024, cast=int)  # bytes
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=4, cast=int)
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml", "text/")
+
+def accepted_encodings(accept_encoding: str) -> dict:
+    encodings = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            encodings[name.strip().lower()] = q
+    return encodings
+
+def negotiate_encoding(accept_encoding: str):
+    encodings = accepted_encodings(accept_encoding)
+    wildcard = encodings.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(candidates, key=lambda name: encodings.get(name, wildcard))
+    return best if encodings.get(best, wildcard) > 0 else None
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    if not content_type or content_type == "text/event-stream":
+        return False
+    return any(
+        content_type.startswith(prefix) if prefix.endswith("/") else content_type == prefix
+        for prefix in COMPRESSIBLE_TYPES
+    )
+
+# The encoded bytes differ from the identity body, so a strong validator becomes weak
+def weaken_etag(headers: MutableHeaders):
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self.compress = self._compressor.process
+            self.finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = self._compressor.compress
+            self.finish = self._compressor.flush
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows how big the response is
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                # e.g. http.response.pathsend: passed through untouched
+                if start_message is not None:
+                    start, start_message = start_message, None
+                    await send(start)
+                await send(message)
+                return
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start["headers"])
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+
+                if start["status"] == 304 and encoding is not None:
+                    # Match the validator the client got with its compressed copy
+                    weaken_etag(headers)
+                elif is_compressible(headers.get("content-type", "")):
+                    headers.add_vary_header("Accept-Encoding")
+                    if (
+                        encoding is not None
+                        and start["status"] not in (204, 206, 304)
+                        and "content-encoding" not in headers
+                        and "content-range" not in headers
+                        and (more_body or len(body) >= self.minimum_size)
+                    ):
+                        compressor = _Compressor(encoding)
+                        headers["Content-Encoding"] = encoding
+                        weaken_etag(headers)
+                        if more_body:
+                            del headers["content-length"]
+                        else:
+                            body = compressor.compress(body) + compressor.finish()
+                            headers["Content-Length"] = str(len(body))
+                            await send(start)
+                            await send({"type": "http.response.body", "body": body})
+                            return
+
+                await send(start)
+                if compressor is None:
+                    await send(message)
+                    return
+
+            if compressor is None:
+                await send(message)
+                return
+
+            body = compressor.compress(message.get("body", b""))
+            if message.get("more_body", False):
+                if body:
+                    await send({"type": "http.response.body", "body": body, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": body + compressor.finish()})
+
+        await self.app(scope, receive, send_compressed)
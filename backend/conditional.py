@@ -0,0 +1,75 @@
+from fastapi import Request, Response
+from sqlalchemy import inspect
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+import hashlib
+
+# Conditional GET: catalog responses carry a strong ETag, so the frontend and
+# CDN can revalidate with If-None-Match and get an empty 304 instead of the
+# full body. Last-Modified is only sent where one timestamp covers the whole
+# body (category list, media files): a row leaving a list, or an instructor's
+# rating changing under a course, does not move any updated_at.
+CACHE_CONTROL = "no-cache"  # cacheable, but always revalidated
+
+def make_etag(data: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _values(row):
+    state = inspect(row, raiseerr=False)
+    if state is None or not hasattr(state, "mapper"):
+        return row
+    # Only attributes that are loaded, so deferred columns are never fetched
+    return tuple(
+        (attr.key, state.dict[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    )
+
+# ETag from the column values of the rows a response is built from, so it
+# can be checked before the body is serialized
+def rows_etag(*rows) -> str:
+    return make_etag(repr([_values(row) for row in rows]).encode())
+
+def http_date(value: datetime) -> str:
+    # Timestamps are stored as naive UTC (datetime.utcnow)
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    # If-None-Match wins; If-Modified-Since is only used without it (RFC 9110 13.2.2)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+    return False
+
+# 304 response if the client's copy is current; otherwise the validators are
+# set on `response` and None is returned
+def not_modified_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
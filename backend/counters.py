@@ -0,0 +1,73 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from decouple import config
+import asyncio
+
+from database import SessionLocal
+from models import Course, Instructor, Enrollment
+from cache import course_cache
+
+# Denormalized enrollment counters (Course.enrollment_count,
+# Instructor.total_students) change with single `SET n = n + delta`
+# UPDATEs instead of a read-modify-write in Python: concurrent enrollments
+# never lose an increment, and the row is only locked for the UPDATE itself,
+# issued right before commit. A periodic reconciliation recomputes both
+# counters from Enrollment to repair any drift.
+COUNTER_RECONCILE_SECONDS = config("COUNTER_RECONCILE_SECONDS", default=3600, cast=float)
+
+async def count_enrollment(db: AsyncSession, course: Course, delta: int = 1):
+    await db.execute(
+        update(Course)
+        .where(Course.id == course.id)
+        .values(enrollment_count=Course.enrollment_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(Instructor)
+        .where(Instructor.id == course.instructor_id)
+        .values(total_students=Instructor.total_students + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+# Rewrites only the rows whose stored count differs; returns how many
+async def reconcile_enrollment_counters(db: AsyncSession) -> dict:
+    course_enrollments = (
+        select(func.count(Enrollment.id))
+        .where(Enrollment.course_id == Course.id)
+        .scalar_subquery()
+    )
+    courses = await db.execute(
+        update(Course)
+        .where(func.coalesce(Course.enrollment_count, -1) != course_enrollments)
+        .values(enrollment_count=course_enrollments)
+        .execution_options(synchronize_session=False)
+    )
+
+    instructor_enrollments = (
+        select(func.count(Enrollment.id))
+        .join(Course, Course.id == Enrollment.course_id)
+        .where(Course.instructor_id == Instructor.id)
+        .scalar_subquery()
+    )
+    instructors = await db.execute(
+        update(Instructor)
+        .where(func.coalesce(Instructor.total_students, -1) != instructor_enrollments)
+        .values(total_students=instructor_enrollments)
+        .execution_options(synchronize_session=False)
+    )
+
+    await db.commit()
+    if courses.rowcount or instructors.rowcount:
+        course_cache.clear()
+    return {"courses": courses.rowcount, "instructors": instructors.rowcount}
+
+async def reconcile_counters_periodically():
+    while True:
+        await asyncio.sleep(COUNTER_RECONCILE_SECONDS)
+        try:
+            async with SessionLocal() as db:
+                fixed = await reconcile_enrollment_counters(db)
+            if fixed["courses"] or fixed["instructors"]:
+                print(f"Reconciled enrollment counters: {fixed}")
+        except Exception as e:
+            print(f"Counter reconciliation failed: {e}")
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Request, Response
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy import select, insert, update, func, case, cast, literal, union_all, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, with_expression
+from pydantic import BaseModel, ValidationError
+from typing import Optional, List, Dict
 from datetime import datetime
-import shutil
-import os
+from decouple import config, Csv
+import csv
+import io
+import json
 
-from database import get_db
-from models import Course, Instructor, User, Lesson, CourseMaterial, Enrollment, Review
+from database import get_db, get_read_db, pin_reads_to_primary
+from cache import course_cache, facets_cache, FACETS_KEY
+from serialization import type_adapter, response_fields, row_dict, dump_json, json_response
+from conditional import make_etag, rows_etag, validator_headers, is_not_modified, not_modified_response
+from models import Course, Instructor, User, Lesson, LessonProgress, Enrollment, Review
 from auth import get_current_user
+from pagination import CursorQuery, keyset_page, finish_keyset_page
+from search import apply_course_search
+from geo import haversine_km, bounding_box, apply_bounding_box
+from normalize import folded_prefix
+from batch import batch_ids
+from fieldsets import FieldsQuery, parse_fields, partial_model, load_fields
+from suggest import suggest_index
+from counters import count_enrollment
+from ratings import count_review
+from media import ThumbnailVariant, THUMBNAIL_MAX_BYTES, image_extension, store_upload, media_url, thumbnail_variants
 
 courses_router = APIRouter()
 
@@ -55,6 +72,34 @@ class LessonCreate(BaseModel):
     is_preview: bool = False
     notes: Optional[str] = None
 
+class LessonImport(LessonCreate):
+    order_index: Optional[int] = None  # omitted: appended after the last lesson
+
+class LessonResponse(BaseModel):
+    id: int
+    course_id: int
+    title: str
+    description: Optional[str]
+    duration_minutes: int
+    order_index: int
+    is_preview: bool
+    notes: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class LessonOrder(BaseModel):
+    lesson_ids: List[int]  # every lesson of the course, in the new order
+
+class CourseInstructor(BaseModel):
+    id: int
+    name: str
+    bio: Optional[str]
+    rating: float
+    total_students: int
+    experience_years: int
+
 class CourseResponse(BaseModel):
     id: int
     title: str
@@ -68,6 +113,7 @@ class CourseResponse(BaseModel):
     subcategory: Optional[str]
     language: str
     thumbnail: Optional[str]
+    thumbnail_variants: Optional[Dict[str, ThumbnailVariant]] = None
     preview_video: Optional[str]
     location: Optional[str]
     latitude: Optional[float]
@@ -78,18 +124,113 @@ class CourseResponse(BaseModel):
     rating: float
     total_ratings: int
     created_at: datetime
-    instructor: dict
+    instructor: CourseInstructor
 
     class Config:
         from_attributes = True
 
+class NearbyCourseResponse(CourseResponse):
+    distance_km: float
+
+class EnrollmentSummary(BaseModel):
+    enrolled_at: datetime
+    progress_percentage: float
+    completed_at: Optional[datetime]
+    completed_lessons: int
+    total_lessons: int
+    watch_time_seconds: int
+
+class MyCourseResponse(CourseResponse):
+    enrollment: EnrollmentSummary
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float]
+    count: int
+
+class CourseFacets(BaseModel):
+    total: int
+    categories: List[FacetCount]
+    levels: List[FacetCount]
+    online: int
+    in_person: int
+    price_histogram: List[PriceBucket]
+    specializations: List[FacetCount]
+
 class ReviewCreate(BaseModel):
     rating: int
     comment: Optional[str] = None
 
+# Instructor and instructor user are loaded in the same query as the course
+# (many-to-one joins), so a catalog page is a single round trip
+catalog_load_options = (
+    joinedload(Course.instructor).joinedload(Instructor.user),
+)
+
+# Lesson progress summary of an enrollment as correlated subqueries, only
+# evaluated for the rows of the page (lesson and lesson progress indexes)
+enrollment_summary_options = (
+    with_expression(Enrollment.completed_lessons, select(func.count(LessonProgress.id)).where(
+        LessonProgress.enrollment_id == Enrollment.id,
+        LessonProgress.is_completed == True
+    ).scalar_subquery()),
+    with_expression(Enrollment.total_lessons, select(func.count(Lesson.id)).where(
+        Lesson.course_id == Enrollment.course_id
+    ).scalar_subquery()),
+    with_expression(Enrollment.watch_time_seconds, select(func.coalesce(func.sum(LessonProgress.watch_time_seconds), 0)).where(
+        LessonProgress.enrollment_id == Enrollment.id
+    ).scalar_subquery()),
+)
+
+# Lower bounds of the facet price histogram buckets; the last one is open-ended
+FACET_PRICE_BUCKETS = config("FACET_PRICE_BUCKETS", default="0,100,250,500,1000,2500", cast=Csv(float))
+# Lessons and request body bytes accepted by one curriculum import
+LESSON_IMPORT_MAX_ROWS = config("LESSON_IMPORT_MAX_ROWS", default=1000, cast=int)
+LESSON_IMPORT_MAX_BYTES = config("LESSON_IMPORT_MAX_BYTES", default=5242880, cast=int)
+
+COURSE_FIELDS = response_fields(CourseResponse, exclude=("instructor",))
+COURSE_INSTRUCTOR_FIELDS = response_fields(CourseInstructor, exclude=("name",))
+ENROLLMENT_FIELDS = response_fields(EnrollmentSummary)
+
 # Utility functions
-def get_instructor_or_404(user: User, db: Session):
-    instructor = db.query(Instructor).filter(Instructor.user_id == user.id).first()
+# catalog_load_options for a sparse fieldset: only the requested columns
+# (plus keys and validators), and the instructor join only when requested
+def course_load_options(fields: tuple = None):
+    if fields is None:
+        return catalog_load_options
+    options = [load_fields(Course, fields, always=("id", "created_at", "updated_at"))]
+    if "instructor" in fields:
+        options.append(joinedload(Course.instructor).options(
+            load_fields(Instructor, COURSE_INSTRUCTOR_FIELDS),
+            joinedload(Instructor.user).options(load_fields(User, (), always=("id", "full_name", "updated_at")))
+        ))
+    return options
+
+# CourseResponse projection (or the `fields` subset of it); instructor and
+# instructor user must be loaded when included
+def course_row(course: Course, fields: tuple = None) -> dict:
+    row = row_dict(course, COURSE_FIELDS if fields is None else [name for name in fields if name != "instructor"])
+    if fields is None or "instructor" in fields:
+        instructor = course.instructor
+        row["instructor"] = {
+            **row_dict(instructor, COURSE_INSTRUCTOR_FIELDS),
+            "name": instructor.user.full_name
+        }
+    return row
+
+# Server defaults and the instructor join, after a commit (replaces refresh)
+async def reload_course(course: Course, db: AsyncSession) -> Course:
+    return await db.scalar(
+        select(Course).options(*catalog_load_options).where(Course.id == course.id)
+        .execution_options(populate_existing=True)
+    )
+
+async def get_instructor_or_404(user: User, db: AsyncSession):
+    instructor = await db.scalar(select(Instructor).where(Instructor.user_id == user.id))
     if not instructor:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -105,6 +246,8 @@ def get_instructor_or_404(user: User, db: Session):
 # Routes
 @courses_router.get("/", response_model=List[CourseResponse])
 async def get_courses(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     category: Optional[str] = None,
@@ -115,63 +258,247 @@ async def get_courses(
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CursorQuery,
+    fields: Optional[str] = FieldsQuery,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Course).filter(Course.is_published == True)
+    selected = parse_fields(fields, CourseResponse)
+    query = select(Course).options(*course_load_options(selected)).where(Course.is_published == True)
     
     # Apply filters
     if category:
-        query = query.filter(Course.category == category)
+        query = query.where(Course.category == category)
     if level:
-        query = query.filter(Course.level == level)
+        query = query.where(Course.level == level)
     if is_online is not None:
-        query = query.filter(Course.is_online == is_online)
+        query = query.where(Course.is_online == is_online)
     if city:
-        query = query.filter(Course.location.ilike(f"%{city}%"))
+        # Locations start with the city ("İstanbul Kadıköy")
+        query = query.where(folded_prefix(Course.location_folded, city))
     if district:
-        query = query.filter(Course.location.ilike(f"%{district}%"))
+        query = query.where(folded_prefix(Course.district_folded, district))
     if search:
-        query = query.filter(
-            or_(
-                Course.title.ilike(f"%{search}%"),
-                Course.description.ilike(f"%{search}%"),
-                Course.category.ilike(f"%{search}%")
-            )
-        )
+        # Full-text index lookup, ranked by relevance (cursor pages keep their own order)
+        query = apply_course_search(query, search, ranked=cursor is None)
     if min_price is not None:
-        query = query.filter(Course.price >= min_price)
+        query = query.where(Course.price >= min_price)
     if max_price is not None:
-        query = query.filter(Course.price <= max_price)
-    
-    # Get courses with instructor info
-    courses = query.offset(skip).limit(limit).all()
-    
-    # Format response with instructor info
-    result = []
-    for course in courses:
-        instructor_info = {
-            "id": course.instructor.id,
-            "name": course.instructor.user.full_name,
-            "bio": course.instructor.bio,
-            "rating": course.instructor.rating,
-            "total_students": course.instructor.total_students,
-            "experience_years": course.instructor.experience_years
-        }
-        
-        course_dict = {
-            **course.__dict__,
-            "instructor": instructor_info
-        }
-        result.append(CourseResponse(**course_dict))
+        query = query.where(Course.price <= max_price)
+    
+    # Get courses with instructor info, newest first like cursor pages
+    # (search results keep their relevance order)
+    if cursor is None:
+        if not search:
+            query = query.order_by(Course.created_at.desc(), Course.id.desc())
+        courses = (await db.scalars(query.offset(skip).limit(limit))).all()
+    else:
+        keys = [Course.created_at, Course.id]
+        courses = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        courses = finish_keyset_page(courses, keys, limit, response)
+    
+    if selected is None or "instructor" in selected:
+        sources = [row for course in courses for row in (course, course.instructor, course.instructor.user)]
+    else:
+        sources = courses
+    # ETag only: a course leaving the list (unpublished, no longer matching)
+    # changes the rows but not the newest updated_at among those left, so a
+    # Last-Modified from the page would revalidate a stale list as current
+    not_modified = not_modified_response(request, response, rows_etag(selected, *sources))
+    if not_modified:
+        return not_modified
+    
+    model = CourseResponse if selected is None else partial_model(CourseResponse, selected)
+    return json_response(List[model], [course_row(course, selected) for course in courses], response)
+
+# Declared before /{course_id}, which would otherwise capture it
+@courses_router.get("/my-courses", response_model=List[MyCourseResponse])
+async def get_my_courses(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = CursorQuery,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Enrollment, course, instructor and instructor user in one joined query
+    query = select(Enrollment).options(
+        joinedload(Enrollment.course).joinedload(Course.instructor).joinedload(Instructor.user),
+        *enrollment_summary_options
+    ).where(Enrollment.student_id == current_user.id)
+    
+    # Most recent enrollments first
+    if cursor is None:
+        query = query.order_by(Enrollment.enrolled_at.desc(), Enrollment.id.desc())
+        enrollments = (await db.scalars(query.offset(skip).limit(limit))).all()
+    else:
+        keys = [Enrollment.enrolled_at, Enrollment.id]
+        enrollments = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        enrollments = finish_keyset_page(enrollments, keys, limit, response)
+    
+    return json_response(List[MyCourseResponse], [
+        {**course_row(enrollment.course), "enrollment": row_dict(enrollment, ENROLLMENT_FIELDS)}
+        for enrollment in enrollments
+    ], response)
+
+@courses_router.get("/facets", response_model=CourseFacets)
+async def get_course_facets(db: AsyncSession = Depends(get_read_db)):
+    cached = facets_cache.get(FACETS_KEY)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    cache_token = facets_cache.token()
+    published = Course.is_published == True
+    price_bucket = case(
+        *[(Course.price < bound, index) for index, bound in enumerate(FACET_PRICE_BUCKETS[1:])],
+        else_=len(FACET_PRICE_BUCKETS) - 1
+    )
+    delivery = case((Course.is_online == True, "online"), else_="in_person")
+    
+    # Grouped on a subquery column, so CASE expressions with bound parameters
+    # group portably (PostgreSQL won't match them between SELECT and GROUP BY)
+    def facet(name, column, *criteria):
+        values = select(cast(column, String).label("value")).where(*criteria).subquery()
+        return select(
+            literal(name).label("facet"),
+            values.c.value,
+            func.count().label("count")
+        ).group_by(values.c.value)
+    
+    # Every facet in one round trip
+    rows = (await db.execute(union_all(
+        facet("category", Course.category, published),
+        facet("level", Course.level, published),
+        facet("delivery", delivery, published),
+        facet("price", price_bucket, published),
+        facet("specialization", Instructor.specialization, Instructor.is_approved == True, Instructor.specialization.isnot(None))
+    ))).all()
+    
+    counts = {"category": {}, "level": {}, "delivery": {}, "price": {}, "specialization": {}}
+    for facet_name, value, count in rows:
+        if value is not None:
+            counts[facet_name][value] = count
+    
+    def ranked(values: dict) -> list:
+        return [
+            {"value": value, "count": count}
+            for value, count in sorted(values.items(), key=lambda item: (-item[1], item[0]))
+        ]
+    
+    bounds = list(FACET_PRICE_BUCKETS) + [None]
+    facets = {
+        "total": sum(counts["delivery"].values()),
+        "categories": ranked(counts["category"]),
+        "levels": ranked(counts["level"]),
+        "online": counts["delivery"].get("online", 0),
+        "in_person": counts["delivery"].get("in_person", 0),
+        "price_histogram": [
+            {"min": bounds[index], "max": bounds[index + 1], "count": counts["price"].get(str(index), 0)}
+            for index in range(len(FACET_PRICE_BUCKETS))
+        ],
+        "specializations": ranked(counts["specialization"])
+    }
     
-    return result
+    payload = dump_json(CourseFacets, facets)
+    facets_cache.set(FACETS_KEY, payload, cache_token)
+    return Response(content=payload, media_type="application/json")
+
+@courses_router.get("/nearby", response_model=List[NearbyCourseResponse])
+async def get_nearby_courses(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=500),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = None,
+    level: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Candidates from the spatial index (bounding box), ids and coordinates only
+    query = select(Course.id, Course.latitude, Course.longitude).where(
+        Course.is_published == True,
+        Course.is_online == False
+    )
+    if category:
+        query = query.where(Course.category == category)
+    if level:
+        query = query.where(Course.level == level)
+    query = apply_bounding_box(query, bounding_box(lat, lng, radius_km))
+    
+    # Exact distance on the candidates, nearest first
+    distances = {}
+    for course_id, course_lat, course_lng in (await db.execute(query)).all():
+        distance = haversine_km(lat, lng, course_lat, course_lng)
+        if distance <= radius_km:
+            distances[course_id] = distance
+    nearest = sorted(distances, key=lambda course_id: (distances[course_id], course_id))[:limit]
+    if not nearest:
+        return []
+    
+    courses = (await db.scalars(
+        select(Course).options(*catalog_load_options).where(Course.id.in_(nearest))
+    )).all()
+    courses = sorted(courses, key=lambda course: (distances[course.id], course.id))
+    
+    return json_response(List[NearbyCourseResponse], [
+        {**course_row(course), "distance_km": round(distances[course.id], 3)}
+        for course in courses
+    ])
+
+# Cache the serialized body; hits skip the query and validation entirely
+def cache_course(course: Course, cache_token) -> tuple:
+    payload = dump_json(CourseResponse, course_row(course))
+    entry = (payload, make_etag(payload))
+    course_cache.set(course.id, entry, cache_token)
+    return entry
+
+@courses_router.get("/batch", response_model=List[CourseResponse])
+async def get_courses_batch(
+    request: Request,
+    ids: List[int] = Depends(batch_ids),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Cached detail bodies are reused; the rest come from a single IN query
+    entries = {course_id: course_cache.get(course_id) for course_id in ids}
+    missing = [course_id for course_id, entry in entries.items() if entry is None]
+    if missing:
+        cache_token = course_cache.token()
+        courses = (await db.scalars(select(Course).options(*catalog_load_options).where(
+            Course.id.in_(missing),
+            Course.is_published == True
+        ))).all()
+        for course in courses:
+            entries[course.id] = cache_course(course, cache_token)
+    
+    found = [entry for entry in entries.values() if entry is not None]
+    payload = b"[" + b",".join(entry[0] for entry in found) + b"]"
+    etag = make_etag(payload)
+    
+    # ETag only, like the list and the detail
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=validator_headers(etag))
+    return Response(content=payload, media_type="application/json", headers=validator_headers(etag))
 
 @courses_router.get("/{course_id}", response_model=CourseResponse)
-async def get_course(course_id: int, db: Session = Depends(get_db)):
-    course = db.query(Course).filter(
+async def get_course(
+    course_id: int,
+    request: Request,
+    fields: Optional[str] = FieldsQuery,
+    db: AsyncSession = Depends(get_read_db)
+):
+    selected = parse_fields(fields, CourseResponse)
+    # ETag only: the body embeds instructor rating, students and name, which
+    # change without touching any updated_at
+    cached = course_cache.get(course_id) if selected is None else None
+    if cached is not None:
+        payload, etag = cached
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=validator_headers(etag))
+        return Response(content=payload, media_type="application/json", headers=validator_headers(etag))
+    
+    cache_token = course_cache.token()
+    course = await db.scalar(select(Course).options(*course_load_options(selected)).where(
         Course.id == course_id,
         Course.is_published == True
-    ).first()
+    ))
     
     if not course:
         raise HTTPException(
@@ -179,29 +506,23 @@ async def get_course(course_id: int, db: Session = Depends(get_db)):
             detail="Course not found"
         )
     
-    instructor_info = {
-        "id": course.instructor.id,
-        "name": course.instructor.user.full_name,
-        "bio": course.instructor.bio,
-        "rating": course.instructor.rating,
-        "total_students": course.instructor.total_students,
-        "experience_years": course.instructor.experience_years
-    }
-    
-    course_dict = {
-        **course.__dict__,
-        "instructor": instructor_info
-    }
-    
-    return CourseResponse(**course_dict)
+    if selected is None:
+        payload, etag = cache_course(course, cache_token)
+    else:
+        # Sparse bodies bypass the detail cache
+        payload = dump_json(partial_model(CourseResponse, selected), course_row(course, selected))
+        etag = make_etag(payload)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=validator_headers(etag))
+    return Response(content=payload, media_type="application/json", headers=validator_headers(etag))
 
 @courses_router.post("/", response_model=CourseResponse)
 async def create_course(
     course_create: CourseCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = get_instructor_or_404(current_user, db)
+    instructor = await get_instructor_or_404(current_user, db)
     
     course = Course(
         **course_create.dict(),
@@ -209,38 +530,25 @@ async def create_course(
     )
     
     db.add(course)
-    db.commit()
-    db.refresh(course)
-    
-    instructor_info = {
-        "id": instructor.id,
-        "name": instructor.user.full_name,
-        "bio": instructor.bio,
-        "rating": instructor.rating,
-        "total_students": instructor.total_students,
-        "experience_years": instructor.experience_years
-    }
-    
-    course_dict = {
-        **course.__dict__,
-        "instructor": instructor_info
-    }
+    await db.commit()
+    course = await reload_course(course, db)
     
-    return CourseResponse(**course_dict)
+    return json_response(CourseResponse, course_row(course))
 
 @courses_router.put("/{course_id}", response_model=CourseResponse)
 async def update_course(
     course_id: int,
     course_update: CourseUpdate,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = get_instructor_or_404(current_user, db)
+    instructor = await get_instructor_or_404(current_user, db)
     
-    course = db.query(Course).filter(
+    course = await db.scalar(select(Course).where(
         Course.id == course_id,
         Course.instructor_id == instructor.id
-    ).first()
+    ))
     
     if not course:
         raise HTTPException(
@@ -253,38 +561,28 @@ async def update_course(
         setattr(course, field, value)
     
     course.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(course)
-    
-    instructor_info = {
-        "id": instructor.id,
-        "name": instructor.user.full_name,
-        "bio": instructor.bio,
-        "rating": instructor.rating,
-        "total_students": instructor.total_students,
-        "experience_years": instructor.experience_years
-    }
-    
-    course_dict = {
-        **course.__dict__,
-        "instructor": instructor_info
-    }
-    
-    return CourseResponse(**course_dict)
+    await db.commit()
+    course_cache.invalidate(course.id)
+    facets_cache.clear()
+    suggest_index.update_course(course)
+    course = await reload_course(course, db)
+    pin_reads_to_primary(response)
+    
+    return json_response(CourseResponse, course_row(course), response)
 
 @courses_router.post("/{course_id}/upload-thumbnail")
 async def upload_thumbnail(
     course_id: int,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = get_instructor_or_404(current_user, db)
+    instructor = await get_instructor_or_404(current_user, db)
     
-    course = db.query(Course).filter(
+    course = await db.scalar(select(Course).where(
         Course.id == course_id,
         Course.instructor_id == instructor.id
-    ).first()
+    ))
     
     if not course:
         raise HTTPException(
@@ -292,37 +590,35 @@ async def upload_thumbnail(
             detail="Course not found or you don't have permission to edit it"
         )
     
-    # Create upload directory if it doesn't exist
-    upload_dir = "uploads/course_thumbnails"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save file
-    file_extension = file.filename.split(".")[-1]
-    filename = f"course_{course_id}_thumbnail.{file_extension}"
-    file_path = os.path.join(upload_dir, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Streamed to content-addressed storage, then resized in the media process pool
+    stored_path = await store_upload(file, "thumbnails", THUMBNAIL_MAX_BYTES, sniff=image_extension)
+    variants = await thumbnail_variants(stored_path)
     
     # Update course thumbnail path
-    course.thumbnail = f"/{file_path}"
-    db.commit()
-    
-    return {"message": "Thumbnail uploaded successfully", "thumbnail_url": course.thumbnail}
+    course.thumbnail = media_url(stored_path)
+    course.thumbnail_variants = variants
+    await db.commit()
+    course_cache.invalidate(course.id)
+    
+    return {
+        "message": "Thumbnail uploaded successfully",
+        "thumbnail_url": course.thumbnail,
+        "thumbnail_variants": course.thumbnail_variants
+    }
 
 @courses_router.post("/{course_id}/lessons")
 async def create_lesson(
     course_id: int,
     lesson_create: LessonCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = get_instructor_or_404(current_user, db)
+    instructor = await get_instructor_or_404(current_user, db)
     
-    course = db.query(Course).filter(
+    course = await db.scalar(select(Course).where(
         Course.id == course_id,
         Course.instructor_id == instructor.id
-    ).first()
+    ))
     
     if not course:
         raise HTTPException(
@@ -336,21 +632,161 @@ async def create_lesson(
     )
     
     db.add(lesson)
-    db.commit()
-    db.refresh(lesson)
+    await db.commit()
+    await db.refresh(lesson)
     
     return lesson
 
+# Curriculum rows from a JSON array of lessons, or CSV with a header row
+# naming LessonImport fields; empty CSV cells fall back to the defaults
+async def read_curriculum(request: Request) -> list:
+    # Oversized bodies are rejected before they are buffered or parsed:
+    # by Content-Length up front, and by counting for chunked uploads
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > LESSON_IMPORT_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Curriculum must be at most {LESSON_IMPORT_MAX_BYTES} bytes"
+        )
+    body = bytearray()
+    async for piece in request.stream():
+        body += piece
+        if len(body) > LESSON_IMPORT_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Curriculum must be at most {LESSON_IMPORT_MAX_BYTES} bytes"
+            )
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in ("text/csv", "application/csv"):
+            reader = csv.DictReader(io.StringIO(bytes(body).decode("utf-8-sig")))
+            rows = [{key: value for key, value in row.items() if key and value not in (None, "")} for row in reader]
+        else:
+            rows = json.loads(body)
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curriculum must be a JSON array or CSV with a header row"
+        )
+    if not isinstance(rows, list) or not rows or len(rows) > LESSON_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {LESSON_IMPORT_MAX_ROWS} lessons"
+        )
+    try:
+        return type_adapter(List[LessonImport]).validate_python(rows)
+    except ValidationError as e:
+        # Every invalid row at once, located by its position in the curriculum
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+
+@courses_router.post("/{course_id}/lessons/bulk", response_model=List[LessonResponse], status_code=status.HTTP_201_CREATED)
+async def import_lessons(
+    course_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    instructor = await get_instructor_or_404(current_user, db)
+    
+    course = await db.scalar(select(Course).where(
+        Course.id == course_id,
+        Course.instructor_id == instructor.id
+    ))
+    
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or you don't have permission to edit it"
+        )
+    
+    lessons = await read_curriculum(request)
+    
+    # Lessons without an order_index go after the current last one, in file order
+    next_index = (await db.scalar(
+        select(func.max(Lesson.order_index)).where(Lesson.course_id == course_id)
+    ) or 0) + 1
+    rows = []
+    for lesson in lessons:
+        row = lesson.dict()
+        if row["order_index"] is None:
+            row["order_index"] = next_index
+            next_index += 1
+        rows.append({**row, "course_id": course_id})
+    
+    # One executemany (batched multi-row INSERT ... RETURNING) and one commit.
+    # A Core insert on the table: ORM bulk inserts ask the session for a
+    # connection by mapper only, which the SQLite profile routes to the reader
+    # (sort_by_parameter_order would make SQLite insert row by row; ids
+    # still follow the input order within the statement)
+    created = await db.execute(insert(Lesson.__table__).returning(*Lesson.__table__.c), rows)
+    created = sorted((dict(row._mapping) for row in created), key=lambda lesson: lesson["id"])
+    await db.commit()
+    
+    return created
+
+@courses_router.put("/{course_id}/lessons/order", response_model=List[LessonResponse])
+async def reorder_lessons(
+    course_id: int,
+    lesson_order: LessonOrder,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    instructor = await get_instructor_or_404(current_user, db)
+    
+    course = await db.scalar(select(Course).where(
+        Course.id == course_id,
+        Course.instructor_id == instructor.id
+    ))
+    
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or you don't have permission to edit it"
+        )
+    
+    lesson_ids = lesson_order.lesson_ids
+    course_lesson_ids = set((await db.scalars(
+        select(Lesson.id).where(Lesson.course_id == course_id)
+    )).all())
+    if len(set(lesson_ids)) != len(lesson_ids) or set(lesson_ids) != course_lesson_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lesson_ids must list every lesson of the course exactly once"
+        )
+    
+    # A single UPDATE: the whole new order is applied atomically
+    if lesson_ids:
+        await db.execute(
+            update(Lesson)
+            .where(Lesson.course_id == course_id)
+            .values(order_index=case(
+                {lesson_id: position for position, lesson_id in enumerate(lesson_ids, start=1)},
+                value=Lesson.id,
+                else_=Lesson.order_index  # a lesson added meanwhile keeps its place
+            ))
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    
+    lessons = await db.scalars(
+        select(Lesson)
+        .where(Lesson.course_id == course_id)
+        .order_by(Lesson.order_index)
+        .execution_options(populate_existing=True)
+    )
+    return lessons.all()
+
 @courses_router.post("/{course_id}/enroll")
 async def enroll_in_course(
     course_id: int,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    course = db.query(Course).filter(
+    course = await db.scalar(select(Course).where(
         Course.id == course_id,
         Course.is_published == True
-    ).first()
+    ))
     
     if not course:
         raise HTTPException(
@@ -359,10 +795,10 @@ async def enroll_in_course(
         )
     
     # Check if already enrolled
-    existing_enrollment = db.query(Enrollment).filter(
+    existing_enrollment = await db.scalar(select(Enrollment).where(
         Enrollment.student_id == current_user.id,
         Enrollment.course_id == course_id
-    ).first()
+    ))
     
     if existing_enrollment:
         raise HTTPException(
@@ -378,13 +814,12 @@ async def enroll_in_course(
     
     db.add(enrollment)
     
-    # Update course enrollment count
-    course.enrollment_count += 1
+    # Course enrollment count and instructor total students, as atomic increments
+    await count_enrollment(db, course)
     
-    # Update instructor total students
-    course.instructor.total_students += 1
-    
-    db.commit()
+    await db.commit()
+    course_cache.invalidate(course_id)
+    pin_reads_to_primary(response)
     
     return {"message": "Successfully enrolled in course"}
 
@@ -392,14 +827,15 @@ async def enroll_in_course(
 async def create_review(
     course_id: int,
     review_create: ReviewCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if enrolled in course
-    enrollment = db.query(Enrollment).filter(
+    enrollment = await db.scalar(select(Enrollment).where(
         Enrollment.student_id == current_user.id,
         Enrollment.course_id == course_id
-    ).first()
+    ))
     
     if not enrollment:
         raise HTTPException(
@@ -408,10 +844,10 @@ async def create_review(
         )
     
     # Check if already reviewed
-    existing_review = db.query(Review).filter(
+    existing_review = await db.scalar(select(Review).where(
         Review.reviewer_id == current_user.id,
         Review.course_id == course_id
-    ).first()
+    ))
     
     if existing_review:
         raise HTTPException(
@@ -419,7 +855,7 @@ async def create_review(
             detail="You have already reviewed this course"
         )
     
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     
     # Create review
     review = Review(
@@ -431,55 +867,32 @@ async def create_review(
     )
     
     db.add(review)
+    await db.flush()
     
-    # Update course rating
-    total_ratings = course.total_ratings + 1
-    new_rating = ((course.rating * course.total_ratings) + review_create.rating) / total_ratings
-    course.rating = round(new_rating, 2)
-    course.total_ratings = total_ratings
-    
-    # Update instructor rating
-    instructor = course.instructor
-    instructor_total_ratings = instructor.total_ratings + 1
-    new_instructor_rating = ((instructor.rating * instructor.total_ratings) + review_create.rating) / instructor_total_ratings
-    instructor.rating = round(new_instructor_rating, 2)
-    instructor.total_ratings = instructor_total_ratings
+    # Course and instructor ratings, as atomic sum/count updates
+    if review.is_approved:
+        await count_review(db, review)
     
-    db.commit()
+    await db.commit()
+    course_cache.invalidate(course_id)
+    pin_reads_to_primary(response)
     
     return {"message": "Review created successfully"}
 
 @courses_router.get("/categories/list")
-async def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Course.category).distinct().filter(Course.is_published == True).all()
-    return [cat[0] for cat in categories if cat[0]]
-
-@courses_router.get("/my-courses")
-async def get_my_courses(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    enrollments = db.query(Enrollment).filter(Enrollment.student_id == current_user.id).all()
-    
-    result = []
-    for enrollment in enrollments:
-        course = enrollment.course
-        instructor_info = {
-            "id": course.instructor.id,
-            "name": course.instructor.user.full_name,
-            "bio": course.instructor.bio,
-            "rating": course.instructor.rating
-        }
-        
-        course_dict = {
-            **course.__dict__,
-            "instructor": instructor_info,
-            "enrollment": {
-                "enrolled_at": enrollment.enrolled_at,
-                "progress_percentage": enrollment.progress_percentage,
-                "completed_at": enrollment.completed_at
-            }
-        }
-        result.append(course_dict)
+async def get_categories(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    # Every course write bumps updated_at (onupdate), so the row count and latest
+    # updated_at version the list; a revalidation hit never runs the DISTINCT
+    total, last_modified = (await db.execute(
+        select(func.count(Course.id), func.max(Course.updated_at))
+    )).one()
+    not_modified = not_modified_response(
+        request, response, make_etag(repr((total, last_modified)).encode()), last_modified
+    )
+    if not_modified:
+        return not_modified
     
-    return result
\ No newline at end of file
+    categories = (await db.execute(
+        select(Course.category).distinct().where(Course.is_published == True)
+    )).all()
+    return [cat[0] for cat in categories if cat[0]]
\ No newline at end of file
@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from decouple import config
+from sqlalchemy import event, Insert, Update, Delete
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from fastapi import Request, Response
+from decouple import config, Csv
+import itertools
+import time
 
 # Database configuration
 DATABASE_URL = config(
@@ -9,22 +14,283 @@ DATABASE_URL = config(
     default="sqlite:///./education_platform.db"
 )
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+# Optional comma separated read replicas; read-only endpoints are spread over them round-robin
+DATABASE_REPLICA_URLS = config("DATABASE_REPLICA_URLS", default="", cast=Csv())
+
+# After a write the client reads from the primary for this many seconds (read-your-writes)
+READ_YOUR_WRITES_SECONDS = config("READ_YOUR_WRITES_SECONDS", default=10, cast=int)
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# SQLite production profile (file databases only): WAL journal, one writer
+# connection that serializes all writes, and a pool of query-only readers
+SQLITE_PROFILE = config("SQLITE_PROFILE", default=True, cast=bool)
+SQLITE_READER_POOL_SIZE = config("SQLITE_READER_POOL_SIZE", default=8, cast=int)
+SQLITE_WRITE_TIMEOUT = config("SQLITE_WRITE_TIMEOUT", default=30, cast=float)  # seconds a write may queue for the writer
+SQLITE_BUSY_TIMEOUT = config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int)  # milliseconds
+SQLITE_MMAP_SIZE = config("SQLITE_MMAP_SIZE", default=268435456, cast=int)  # bytes
+SQLITE_CACHE_SIZE = config("SQLITE_CACHE_SIZE", default=-65536, cast=int)  # pages, negative = KiB
+
+# Connection pool configuration (per deployment)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)  # seconds to wait for a free connection
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)  # seconds, -1 disables
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+DB_STATEMENT_TIMEOUT = config("DB_STATEMENT_TIMEOUT", default=0, cast=int)  # milliseconds, 0 disables (PostgreSQL only)
+
+# Map plain URLs onto their async drivers (aiosqlite / asyncpg)
+def to_async_url(url: str) -> str:
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout wait time, hold time and connection age."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_overflow_limit = kwargs.get("max_overflow", 10)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.connected_at = {}
+        self.checked_out_at = {}
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "close", self._on_close)
+        event.listen(self, "detach", self._on_close)
+        event.listen(self, "checkout", self._on_checkout)
+        event.listen(self, "checkin", self._on_checkin)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connected_at[id(connection_record)] = time.time()
+
+    def _on_close(self, dbapi_connection, connection_record):
+        self.connected_at.pop(id(connection_record), None)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self.checked_out_at[id(connection_record)] = time.time()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = self.checked_out_at.pop(id(connection_record), None)
+        if started is not None:
+            held = time.time() - started
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+
+def engine_options(url: str) -> dict:
+    if "sqlite" in url:
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url:
+            return options
+    else:
+        options = {"connect_args": {}}
+        if DB_STATEMENT_TIMEOUT:
+            options["connect_args"]["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}
+
+    options.update(
+        poolclass=InstrumentedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def on_sqlite_writer_connect(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
+    # Let SQLAlchemy emit BEGIN itself (see on_sqlite_writer_begin)
+    dbapi_connection.isolation_level = None
+
+def on_sqlite_writer_begin(conn):
+    # Take the write lock up front instead of upgrading a read lock mid-transaction
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def on_sqlite_reader_connect(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+# Planner statistics, so subqueries on the FTS / R-tree indexes drive the
+# lookup instead of a low-selectivity column index. analysis_limit bounds
+# the cost of ANALYZE on large tables.
+async def refresh_sqlite_statistics(conn):
+    if conn.dialect.name == "sqlite":
+        await conn.exec_driver_sql("PRAGMA analysis_limit=1000")
+        await conn.exec_driver_sql("ANALYZE")
+
+USE_SQLITE_PROFILE = (
+    SQLITE_PROFILE
+    and DATABASE_URL.startswith("sqlite")
+    and ":memory:" not in DATABASE_URL
 )
 
+# Create engine
+if USE_SQLITE_PROFILE:
+    # Single writer connection: the pool queue is the write queue
+    engine = create_async_engine(ASYNC_DATABASE_URL, **{
+        **engine_options(DATABASE_URL),
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": SQLITE_WRITE_TIMEOUT
+    })
+    reader_engine = create_async_engine(ASYNC_DATABASE_URL, **{
+        **engine_options(DATABASE_URL),
+        "pool_size": SQLITE_READER_POOL_SIZE,
+        "max_overflow": 0
+    })
+    event.listen(engine.sync_engine, "connect", on_sqlite_writer_connect)
+    event.listen(engine.sync_engine, "begin", on_sqlite_writer_begin)
+    event.listen(reader_engine.sync_engine, "connect", on_sqlite_reader_connect)
+else:
+    engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(DATABASE_URL))
+    reader_engine = None
+
+replica_engines = [
+    create_async_engine(to_async_url(url), **engine_options(url))
+    for url in DATABASE_REPLICA_URLS
+]
+
+def pool_status(engine) -> dict:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {"pool_class": type(pool).__name__, "status": pool.status()}
+
+    now = time.time()
+    ages = [now - connected for connected in pool.connected_at.values()]
+    holds = [now - started for started in pool.checked_out_at.values()]
+    return {
+        "pool_class": type(pool).__name__,
+        "pool_size": pool.size(),
+        "max_overflow": pool.max_overflow_limit,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "wait": {
+            "count": pool.wait_count,
+            "avg_ms": round(pool.wait_total / pool.wait_count * 1000, 3) if pool.wait_count else 0.0,
+            "max_ms": round(pool.wait_max * 1000, 3),
+            "timeouts": pool.timeouts
+        },
+        "checkouts": {
+            "total": pool.checkouts,
+            "avg_hold_ms": round(pool.hold_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            "max_hold_ms": round(pool.hold_max * 1000, 3),
+            "longest_current_s": round(max(holds), 3) if holds else 0.0
+        },
+        "connections": {
+            "open": len(ages),
+            "oldest_age_s": round(max(ages), 3) if ages else 0.0,
+            "avg_age_s": round(sum(ages) / len(ages), 3) if ages else 0.0,
+            "recycle_after_s": DB_POOL_RECYCLE
+        }
+    }
+
+# SQLite profile session: flushes, INSERT/UPDATE/DELETE and SELECT ... FOR
+# UPDATE go to the writer, everything else is read through the reader pool.
+# Once a transaction has written, it stays on the writer until it ends, so it
+# reads its own uncommitted rows.
+class SQLiteRoutingSession(Session):
+    _writing = False
+    
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self._writing
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self._writing = True
+            return engine.sync_engine
+        return reader_engine.sync_engine
+
+@event.listens_for(SQLiteRoutingSession, "after_transaction_end")
+def on_routing_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes stay readable after commit without implicit IO
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    sync_session_class=SQLiteRoutingSession if USE_SQLITE_PROFILE else Session,
+    autoflush=False,
+    expire_on_commit=False
+)
+ReplicaSessions = [
+    async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False)
+    for replica in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessions)
 
 # Create Base class
-Base = declarative_base()
+# AsyncAttrs exposes `obj.awaitable_attrs.<relationship>` for lazy loads under asyncio
+class Base(AsyncAttrs, DeclarativeBase):
+    pass
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+def reads_pinned_to_primary(request: Request) -> bool:
     try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+# Read-only endpoints: a replica session (round-robin), or the primary
+# when no replicas are configured or the client has just written
+async def get_read_db(request: Request):
+    if not ReplicaSessions or reads_pinned_to_primary(request):
+        session_factory = SessionLocal
+    else:
+        session_factory = next(_replica_cycle)
+    async with session_factory() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+# Call from write endpoints so the client's next reads see its own writes
+def pin_reads_to_primary(response: Response):
+    if ReplicaSessions and READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
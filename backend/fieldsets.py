@@ -0,0 +1,42 @@
+from fastapi import HTTPException, Query, status
+from pydantic import create_model
+from sqlalchemy.orm import load_only
+from functools import lru_cache
+from typing import Optional
+
+# Sparse fieldsets: `fields=id,title,price,thumbnail` trims a catalog
+# response to the listed top-level fields, both in the SELECT (load_only)
+# and in the serialized body. Nested objects are all-or-nothing.
+FieldsQuery = Query(
+    None,
+    description="Comma-separated response fields, e.g. id,title,price,thumbnail; all fields when omitted"
+)
+
+# Requested names in the model's declaration order, so equal field sets
+# share one partial model; None when `fields` was not given
+def parse_fields(fields: Optional[str], model) -> Optional[tuple]:
+    if fields is None:
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(model.model_fields)
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}" if unknown else "fields must not be empty"
+        )
+    return tuple(name for name in model.model_fields if name in requested)
+
+@lru_cache(maxsize=256)
+def partial_model(model, fields: tuple):
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+# load_only for the requested columns of `entity` plus the `always` ones
+# the handler itself reads (keys, validators); relationships are skipped
+def load_fields(entity, fields: tuple, always=()):
+    columns = entity.__mapper__.column_attrs.keys()
+    names = dict.fromkeys([*always, *(name for name in fields if name in columns)])
+    return load_only(*(getattr(entity, name) for name in names))
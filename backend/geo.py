@@ -0,0 +1,104 @@
+from sqlalchemy import select, text, table, column, func
+import math
+
+from database import engine
+from models import Course
+
+# Spatial index over Course.latitude / longitude:
+# an R-tree (kept in sync by triggers) on SQLite, a GiST index on
+# point(longitude, latitude) on PostgreSQL. Both answer bounding box
+# lookups; exact distances are computed on the candidates.
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+courses_rtree = table(
+    "courses_rtree",
+    column("id"), column("min_lat"), column("max_lat"), column("min_lng"), column("max_lng")
+)
+
+SQLITE_GEO_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS courses_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_rtree_ai AFTER INSERT ON courses
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO courses_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_rtree_ad AFTER DELETE ON courses BEGIN
+        DELETE FROM courses_rtree WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_rtree_au AFTER UPDATE OF latitude, longitude ON courses BEGIN
+        DELETE FROM courses_rtree WHERE id = old.id;
+        INSERT INTO courses_rtree
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END
+    """,
+]
+
+POSTGRES_GEO_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_courses_location_point ON courses USING GIST (point(longitude, latitude))",
+]
+
+# Called once at startup, inside the create_all transaction
+async def setup_course_geo(conn):
+    if conn.dialect.name == "sqlite":
+        existing = await conn.scalar(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'courses_rtree'"
+        ))
+        for statement in SQLITE_GEO_DDL:
+            await conn.execute(text(statement))
+        if not existing:
+            # Index rows that were written before the R-tree existed
+            await conn.execute(text(
+                "INSERT INTO courses_rtree "
+                "SELECT id, latitude, latitude, longitude, longitude FROM courses "
+                "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            ))
+    elif conn.dialect.name == "postgresql":
+        for statement in POSTGRES_GEO_DDL:
+            await conn.execute(text(statement))
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+# (south, west, north, east) box that contains the circle
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple:
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return (max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0))
+
+# Restrict a Course select to rows inside the bounding box, through the spatial index
+def apply_bounding_box(query, box: tuple):
+    south, west, north, east = box
+
+    if engine.dialect.name == "sqlite":
+        # Subquery (not a join) so the planner drives the lookup from the R-tree
+        return query.where(Course.id.in_(
+            select(courses_rtree.c.id).where(
+                courses_rtree.c.min_lat >= south,
+                courses_rtree.c.max_lat <= north,
+                courses_rtree.c.min_lng >= west,
+                courses_rtree.c.max_lng <= east
+            )
+        ))
+
+    if engine.dialect.name == "postgresql":
+        return query.where(
+            func.point(Course.longitude, Course.latitude).op("<@")(
+                func.box(func.point(west, south), func.point(east, north))
+            )
+        )
+
+    return query.where(
+        Course.latitude.between(south, north),
+        Course.longitude.between(west, east)
+    )
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Instructor, User, Course, Review
 from auth import get_current_user
+from pagination import CursorQuery, keyset_page, finish_keyset_page
+from cache import course_cache, facets_cache
+from normalize import folded_equals, folded_prefix
+from serialization import response_fields, row_dict, json_response
+from conditional import rows_etag, not_modified_response
+from batch import batch_ids
+from fieldsets import FieldsQuery, parse_fields, partial_model, load_fields
 
 instructors_router = APIRouter()
 
@@ -24,6 +32,13 @@ class InstructorUpdate(BaseModel):
     experience_years: Optional[int] = None
     certification: Optional[str] = None
 
+class InstructorUser(BaseModel):
+    id: int
+    full_name: str
+    city: Optional[str]
+    district: Optional[str]
+    profile_image: Optional[str]
+
 class InstructorResponse(BaseModel):
     id: int
     bio: Optional[str]
@@ -34,7 +49,7 @@ class InstructorResponse(BaseModel):
     total_students: int
     is_approved: bool
     created_at: datetime
-    user: dict
+    user: InstructorUser
     total_courses: int
 
     class Config:
@@ -56,9 +71,26 @@ class InstructorPublicResponse(BaseModel):
     class Config:
         from_attributes = True
 
+INSTRUCTOR_FIELDS = response_fields(InstructorResponse, exclude=("user", "total_courses"))
+INSTRUCTOR_USER_FIELDS = response_fields(InstructorUser)
+INSTRUCTOR_PUBLIC_FIELDS = response_fields(InstructorPublicResponse, exclude=("user", "total_courses", "courses"))
+INSTRUCTOR_COURSE_FIELDS = (
+    "id", "title", "short_description", "price", "discount_price", "duration_hours", "level",
+    "category", "thumbnail", "thumbnail_variants", "rating", "enrollment_count", "is_online", "location"
+)
+
+def instructor_public_row(instructor: Instructor, courses: list) -> dict:
+    return {
+        **row_dict(instructor, INSTRUCTOR_PUBLIC_FIELDS),
+        "user": row_dict(instructor.user, INSTRUCTOR_USER_FIELDS),
+        "total_courses": len(courses),
+        "courses": [row_dict(course, INSTRUCTOR_COURSE_FIELDS) for course in courses]
+    }
+
 # Routes
 @instructors_router.get("/", response_model=List[InstructorResponse])
 async def get_instructors(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     specialization: Optional[str] = None,
@@ -67,74 +99,131 @@ async def get_instructors(
     search: Optional[str] = None,
     min_rating: Optional[float] = None,
     min_experience: Optional[int] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CursorQuery,
+    fields: Optional[str] = FieldsQuery,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Instructor).filter(Instructor.is_approved == True)
+    selected = parse_fields(fields, InstructorResponse)
+    if selected is None:
+        options = [joinedload(Instructor.user)]
+    else:
+        # Requested columns plus the sort keys; the user join only when requested
+        options = [load_fields(Instructor, selected, always=("id", "rating", "total_students"))]
+        if "user" in selected:
+            options.append(joinedload(Instructor.user).options(load_fields(User, INSTRUCTOR_USER_FIELDS)))
+    query = select(Instructor).options(*options).where(Instructor.is_approved == True)
     
     # Apply filters
     if specialization:
-        query = query.filter(Instructor.specialization.ilike(f"%{specialization}%"))
+        query = query.where(folded_prefix(Instructor.specialization_folded, specialization))
     
-    if city or district:
-        query = query.join(User).filter(
-            or_(
-                User.city.ilike(f"%{city}%") if city else True,
-                User.district.ilike(f"%{district}%") if district else True
-            )
-        )
+    if city or district or search:
+        query = query.join(User)
+    
+    if city:
+        query = query.where(folded_equals(User.city_folded, city))
+    
+    if district:
+        query = query.where(folded_equals(User.district_folded, district))
     
     if search:
-        query = query.join(User).filter(
+        query = query.where(
             or_(
-                User.full_name.ilike(f"%{search}%"),
-                Instructor.bio.ilike(f"%{search}%"),
-                Instructor.specialization.ilike(f"%{search}%")
+                folded_prefix(User.full_name_folded, search),
+                folded_prefix(Instructor.specialization_folded, search)
             )
         )
     
     if min_rating is not None:
-        query = query.filter(Instructor.rating >= min_rating)
+        query = query.where(Instructor.rating >= min_rating)
     
     if min_experience is not None:
-        query = query.filter(Instructor.experience_years >= min_experience)
+        query = query.where(Instructor.experience_years >= min_experience)
     
     # Order by rating and total students
-    query = query.order_by(Instructor.rating.desc(), Instructor.total_students.desc())
-    
-    instructors = query.offset(skip).limit(limit).all()
+    if cursor is None:
+        query = query.order_by(Instructor.rating.desc(), Instructor.total_students.desc())
+        instructors = (await db.scalars(query.offset(skip).limit(limit))).all()
+    else:
+        keys = [Instructor.rating, Instructor.total_students, Instructor.id]
+        instructors = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        instructors = finish_keyset_page(instructors, keys, limit, response)
+    
+    # Published course counts for the whole page in one grouped query
+    with_user = selected is None or "user" in selected
+    with_total_courses = selected is None or "total_courses" in selected
+    course_counts = {}
+    if with_total_courses:
+        course_counts = dict((await db.execute(
+            select(Course.instructor_id, func.count(Course.id))
+            .where(
+                Course.instructor_id.in_([instructor.id for instructor in instructors]),
+                Course.is_published == True
+            )
+            .group_by(Course.instructor_id)
+        )).all())
     
-    # Format response
-    result = []
+    columns = INSTRUCTOR_FIELDS if selected is None else [name for name in selected if name not in ("user", "total_courses")]
+    rows = []
     for instructor in instructors:
-        user_info = {
-            "id": instructor.user.id,
-            "full_name": instructor.user.full_name,
-            "city": instructor.user.city,
-            "district": instructor.user.district,
-            "profile_image": instructor.user.profile_image
-        }
-        
-        # Count total courses
-        total_courses = db.query(Course).filter(
-            Course.instructor_id == instructor.id,
+        row = row_dict(instructor, columns)
+        if with_user:
+            row["user"] = row_dict(instructor.user, INSTRUCTOR_USER_FIELDS)
+        if with_total_courses:
+            row["total_courses"] = course_counts.get(instructor.id, 0)
+        rows.append(row)
+    
+    model = InstructorResponse if selected is None else partial_model(InstructorResponse, selected)
+    return json_response(List[model], rows, response)
+
+@instructors_router.get("/batch", response_model=List[InstructorPublicResponse])
+async def get_instructors_batch(
+    request: Request,
+    response: Response,
+    ids: List[int] = Depends(batch_ids),
+    db: AsyncSession = Depends(get_read_db)
+):
+    instructors = (await db.scalars(
+        select(Instructor)
+        .options(joinedload(Instructor.user))
+        .where(Instructor.id.in_(ids), Instructor.is_approved == True)
+    )).all()
+    order = {instructor_id: index for index, instructor_id in enumerate(ids)}
+    instructors = sorted(instructors, key=lambda instructor: order[instructor.id])
+    
+    # Published courses of every instructor in the batch, in one more IN query
+    courses = {instructor.id: [] for instructor in instructors}
+    if courses:
+        for course in (await db.scalars(select(Course).where(
+            Course.instructor_id.in_(courses),
             Course.is_published == True
-        ).count()
-        
-        instructor_dict = {
-            **instructor.__dict__,
-            "user": user_info,
-            "total_courses": total_courses
-        }
-        result.append(InstructorResponse(**instructor_dict))
+        ))).all():
+            courses[course.instructor_id].append(course)
+    
+    all_courses = [course for instructor_courses in courses.values() for course in instructor_courses]
+    # ETag only: rows leaving the list would not move a Last-Modified
+    not_modified = not_modified_response(
+        request, response,
+        rows_etag(*instructors, *(instructor.user for instructor in instructors), *all_courses)
+    )
+    if not_modified:
+        return not_modified
     
-    return result
+    return json_response(List[InstructorPublicResponse], [
+        instructor_public_row(instructor, courses[instructor.id]) for instructor in instructors
+    ], response)
 
 @instructors_router.get("/{instructor_id}", response_model=InstructorPublicResponse)
-async def get_instructor(instructor_id: int, db: Session = Depends(get_db)):
-    instructor = db.query(Instructor).filter(
+async def get_instructor(
+    instructor_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    instructor = await db.scalar(select(Instructor).where(
         Instructor.id == instructor_id,
         Instructor.is_approved == True
-    ).first()
+    ))
     
     if not instructor:
         raise HTTPException(
@@ -142,56 +231,29 @@ async def get_instructor(instructor_id: int, db: Session = Depends(get_db)):
             detail="Instructor not found"
         )
     
-    user_info = {
-        "id": instructor.user.id,
-        "full_name": instructor.user.full_name,
-        "city": instructor.user.city,
-        "district": instructor.user.district,
-        "profile_image": instructor.user.profile_image
-    }
+    user = await instructor.awaitable_attrs.user
     
     # Get instructor's courses
-    courses = db.query(Course).filter(
+    courses = (await db.scalars(select(Course).where(
         Course.instructor_id == instructor_id,
         Course.is_published == True
-    ).all()
+    ))).all()
     
-    courses_info = []
-    for course in courses:
-        course_dict = {
-            "id": course.id,
-            "title": course.title,
-            "short_description": course.short_description,
-            "price": course.price,
-            "discount_price": course.discount_price,
-            "duration_hours": course.duration_hours,
-            "level": course.level,
-            "category": course.category,
-            "thumbnail": course.thumbnail,
-            "rating": course.rating,
-            "enrollment_count": course.enrollment_count,
-            "is_online": course.is_online,
-            "location": course.location
-        }
-        courses_info.append(course_dict)
-    
-    instructor_dict = {
-        **instructor.__dict__,
-        "user": user_info,
-        "total_courses": len(courses_info),
-        "courses": courses_info
-    }
+    # ETag only: an unpublished course drops out without moving a Last-Modified
+    not_modified = not_modified_response(request, response, rows_etag(instructor, user, *courses))
+    if not_modified:
+        return not_modified
     
-    return InstructorPublicResponse(**instructor_dict)
+    return json_response(InstructorPublicResponse, instructor_public_row(instructor, courses), response)
 
 @instructors_router.post("/apply")
 async def apply_as_instructor(
     instructor_create: InstructorCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if user already has an instructor profile
-    existing_instructor = db.query(Instructor).filter(Instructor.user_id == current_user.id).first()
+    existing_instructor = await db.scalar(select(Instructor).where(Instructor.user_id == current_user.id))
     
     if existing_instructor:
         raise HTTPException(
@@ -214,8 +276,8 @@ async def apply_as_instructor(
     # Update user role
     current_user.role = "instructor"
     
-    db.commit()
-    db.refresh(instructor)
+    await db.commit()
+    await db.refresh(instructor)
     
     return {
         "message": "Instructor application submitted successfully. Please wait for admin approval.",
@@ -226,9 +288,9 @@ async def apply_as_instructor(
 async def update_instructor_profile(
     instructor_update: InstructorUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = db.query(Instructor).filter(Instructor.user_id == current_user.id).first()
+    instructor = await db.scalar(select(Instructor).where(Instructor.user_id == current_user.id))
     
     if not instructor:
         raise HTTPException(
@@ -240,21 +302,29 @@ async def update_instructor_profile(
     for field, value in instructor_update.dict(exclude_unset=True).items():
         setattr(instructor, field, value)
     
-    db.commit()
-    db.refresh(instructor)
+    # Instructors have no updated_at; the user's stands in for Last-Modified
+    current_user.updated_at = datetime.utcnow()
+    
+    await db.commit()
+    # Course detail payloads embed the instructor's profile
+    course_ids = (await db.scalars(select(Course.id).where(Course.instructor_id == instructor.id))).all()
+    course_cache.invalidate(*course_ids)
+    facets_cache.clear()
+    await db.refresh(instructor)
     
+    user = await instructor.awaitable_attrs.user
     user_info = {
-        "id": instructor.user.id,
-        "full_name": instructor.user.full_name,
-        "city": instructor.user.city,
-        "district": instructor.user.district,
-        "profile_image": instructor.user.profile_image
+        "id": user.id,
+        "full_name": user.full_name,
+        "city": user.city,
+        "district": user.district,
+        "profile_image": user.profile_image
     }
     
-    total_courses = db.query(Course).filter(
+    total_courses = await db.scalar(select(func.count(Course.id)).where(
         Course.instructor_id == instructor.id,
         Course.is_published == True
-    ).count()
+    ))
     
     instructor_dict = {
         **instructor.__dict__,
@@ -267,9 +337,9 @@ async def update_instructor_profile(
 @instructors_router.get("/my/profile")
 async def get_my_instructor_profile(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    instructor = db.query(Instructor).filter(Instructor.user_id == current_user.id).first()
+    instructor = await db.scalar(select(Instructor).where(Instructor.user_id == current_user.id))
     
     if not instructor:
         raise HTTPException(
@@ -277,18 +347,19 @@ async def get_my_instructor_profile(
             detail="Instructor profile not found"
         )
     
+    user = await instructor.awaitable_attrs.user
     user_info = {
-        "id": instructor.user.id,
-        "full_name": instructor.user.full_name,
-        "email": instructor.user.email,
-        "phone": instructor.user.phone,
-        "city": instructor.user.city,
-        "district": instructor.user.district,
-        "profile_image": instructor.user.profile_image
+        "id": user.id,
+        "full_name": user.full_name,
+        "email": user.email,
+        "phone": user.phone,
+        "city": user.city,
+        "district": user.district,
+        "profile_image": user.profile_image
     }
     
     # Get instructor's courses (including unpublished)
-    courses = db.query(Course).filter(Course.instructor_id == instructor.id).all()
+    courses = (await db.scalars(select(Course).where(Course.instructor_id == instructor.id))).all()
     
     courses_info = []
     for course in courses:
@@ -324,14 +395,16 @@ async def get_my_instructor_profile(
 @instructors_router.get("/{instructor_id}/reviews")
 async def get_instructor_reviews(
     instructor_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CursorQuery,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    instructor = db.query(Instructor).filter(
+    instructor = await db.scalar(select(Instructor).where(
         Instructor.id == instructor_id,
         Instructor.is_approved == True
-    ).first()
+    ))
     
     if not instructor:
         raise HTTPException(
@@ -339,35 +412,43 @@ async def get_instructor_reviews(
             detail="Instructor not found"
         )
     
-    reviews = db.query(Review).filter(
+    query = select(Review).where(
         Review.instructor_id == instructor_id,
         Review.is_approved == True
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    if cursor is None:
+        reviews = (await db.scalars(query.order_by(Review.created_at.desc()).offset(skip).limit(limit))).all()
+    else:
+        keys = [Review.created_at, Review.id]
+        reviews = (await db.scalars(keyset_page(query, keys, cursor, limit))).all()
+        reviews = finish_keyset_page(reviews, keys, limit, response)
     
     result = []
     for review in reviews:
+        reviewer = await review.awaitable_attrs.reviewer
+        course = await review.awaitable_attrs.course
         review_dict = {
             "id": review.id,
             "rating": review.rating,
             "comment": review.comment,
             "created_at": review.created_at,
             "reviewer": {
-                "full_name": review.reviewer.full_name,
-                "profile_image": review.reviewer.profile_image
+                "full_name": reviewer.full_name,
+                "profile_image": reviewer.profile_image
             },
             "course": {
-                "id": review.course.id,
-                "title": review.course.title
-            } if review.course else None
+                "id": course.id,
+                "title": course.title
+            } if course else None
         }
         result.append(review_dict)
     
     return result
 
 @instructors_router.get("/specializations/list")
-async def get_specializations(db: Session = Depends(get_db)):
-    specializations = db.query(Instructor.specialization).distinct().filter(
+async def get_specializations(db: AsyncSession = Depends(get_read_db)):
+    specializations = (await db.execute(select(Instructor.specialization).distinct().where(
         Instructor.is_approved == True,
         Instructor.specialization.isnot(None)
-    ).all()
+    ))).all()
     return [spec[0] for spec in specializations if spec[0]]
\ No newline at end of file
@@ -1,12 +1,23 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from contextlib import asynccontextmanager
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager, suppress
+from decouple import config, Csv
+import asyncio
 import uvicorn
 
-from database import engine, get_db
+from database import engine, reader_engine, replica_engines, get_db, refresh_sqlite_statistics
 from models import Base
+from search import setup_course_search
+from geo import setup_course_geo
+from pagination import NEXT_CURSOR_HEADER
+from compression import CompressionMiddleware
+from suggest import suggest_router, rebuild_suggest_index, refresh_suggest_index_periodically
+from counters import reconcile_counters_periodically
+from ratings import recompute_ratings_periodically
+from media import media_router, shutdown_media_pool
+from materials import materials_router, expire_material_uploads_periodically
 from auth import auth_router
 from courses import courses_router
 from instructors import instructors_router
@@ -14,44 +25,79 @@ from payments import payments_router
 from ai import ai_router
 from admin import admin_router
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting up application...")
+    # Create database tables
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await setup_course_search(conn)
+        await setup_course_geo(conn)
+        await refresh_sqlite_statistics(conn)
+    # In-memory typeahead index, kept in step with other workers' writes
+    await rebuild_suggest_index()
+    background_tasks = [
+        asyncio.create_task(refresh_suggest_index_periodically()),
+        # Repairs any drift of the denormalized enrollment counters and ratings
+        asyncio.create_task(reconcile_counters_periodically()),
+        asyncio.create_task(recompute_ratings_periodically()),
+        asyncio.create_task(expire_material_uploads_periodically()),
+    ]
     yield
     # Shutdown
     print("Shutting down application...")
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    shutdown_media_pool()
+    await engine.dispose()
+    if reader_engine is not None:
+        await reader_engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
 
 app = FastAPI(
     title="Eğitim Platformu API",
     description="Modern eğitim platformu için comprehensive API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
+# Explicit origins: the frontend sends credentials (the read-your-writes
+# cookie), which browsers refuse with a wildcard origin
+CORS_ORIGINS = config("CORS_ORIGINS", default="http://localhost:3000,http://127.0.0.1:3000", cast=Csv())
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Development için tüm origin'lere izin ver
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Upload-Offset", "Upload-Length", "Location"],
 )
 
+# gzip / brotli for JSON and text responses above COMPRESSION_MINIMUM_SIZE
+app.add_middleware(CompressionMiddleware)
+
 # Security
 security = HTTPBearer()
 
 # Routes
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(courses_router, prefix="/api/courses", tags=["Courses"])
+app.include_router(materials_router, prefix="/api/courses", tags=["Course Materials"])
+app.include_router(suggest_router, prefix="/api/search", tags=["Search"])
 app.include_router(instructors_router, prefix="/api/instructors", tags=["Instructors"])
 app.include_router(payments_router, prefix="/api/payments", tags=["Payments"])
 app.include_router(ai_router, prefix="/api/ai", tags=["AI Services"])
 app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 
+# Uploaded media (/media, and legacy /uploads paths)
+app.include_router(media_router, tags=["Media"])
+
 @app.get("/")
 async def root():
     return {
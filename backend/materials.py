@@ -0,0 +1,450 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime, timedelta
+from decouple import config
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import shutil
+import uuid
+
+from database import get_db, SessionLocal
+from models import Course, CourseMaterial, MaterialUpload, User
+from auth import get_current_user
+from courses import get_instructor_or_404
+from media import UPLOAD_CHUNK_SIZE, partial_upload_path, save_partial, media_url
+
+materials_router = APIRouter()
+
+# Resumable CourseMaterial uploads. The client opens an upload with the file's
+# size, then PUTs fixed-size chunks by index, in any order and in parallel,
+# each with an `Upload-Checksum: sha256 <base64>` header. Every chunk is
+# streamed straight to its offset in a preallocated file under
+# MEDIA_ROOT/partial and only counted once its checksum matches, so a dropped
+# connection costs at most the chunks in flight. GET/HEAD on the upload
+# reports the missing chunks and, tus-style, the Upload-Offset up to which
+# everything has arrived. Completing it moves the file to content-addressed
+# storage and creates the CourseMaterial.
+MATERIAL_MAX_BYTES = config("MATERIAL_MAX_BYTES", default=4 * 1024 ** 3, cast=int)
+MATERIAL_CHUNK_SIZE = config("MATERIAL_CHUNK_SIZE", default=8 * 1024 * 1024, cast=int)
+MATERIAL_UPLOAD_TTL_HOURS = config("MATERIAL_UPLOAD_TTL_HOURS", default=24, cast=float)  # since the last chunk
+UPLOAD_CLEANUP_SECONDS = config("UPLOAD_CLEANUP_SECONDS", default=3600, cast=float)
+
+# Accepted extensions -> CourseMaterial.file_type
+MATERIAL_TYPES = {
+    "pdf": "pdf",
+    "doc": "doc", "docx": "doc", "odt": "doc", "txt": "doc",
+    "ppt": "slides", "pptx": "slides", "odp": "slides",
+    "xls": "sheet", "xlsx": "sheet", "ods": "sheet", "csv": "sheet",
+    "zip": "archive",
+    "mp4": "video", "webm": "video", "mov": "video", "mkv": "video",
+    "mp3": "audio", "m4a": "audio", "ogg": "audio", "wav": "audio",
+    "jpg": "image", "jpeg": "image", "png": "image", "webp": "image",
+}
+SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+# Pydantic models
+class MaterialUploadCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    filename: str
+    size: int
+    checksum: Optional[str] = None  # sha256 hex of the whole file, checked on completion
+
+class MaterialUploadResponse(BaseModel):
+    id: str
+    course_id: int
+    title: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    offset: int
+    missing_chunks: List[int]
+    expires_at: datetime
+
+class CourseMaterialResponse(BaseModel):
+    id: int
+    course_id: int
+    title: str
+    file_url: str
+    file_type: str
+    file_size: Optional[int]
+    description: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+def chunk_dir(upload_id: str) -> str:
+    # One empty marker file per verified chunk; creating a file is atomic, so
+    # parallel chunk requests (even on other workers) never race on a counter
+    return partial_upload_path(f"{upload_id}.chunks")
+
+def total_chunks(upload: MaterialUpload) -> int:
+    return -(-upload.total_size // upload.chunk_size)
+
+def received_chunks(upload: MaterialUpload) -> set:
+    try:
+        return {int(name) for name in os.listdir(chunk_dir(upload.id))}
+    except FileNotFoundError:
+        return set()
+
+def upload_status(upload: MaterialUpload) -> dict:
+    received = received_chunks(upload)
+    count = total_chunks(upload)
+    contiguous = 0
+    while contiguous < count and contiguous in received:
+        contiguous += 1
+    return {
+        "id": upload.id,
+        "course_id": upload.course_id,
+        "title": upload.title,
+        "filename": upload.filename,
+        "total_size": upload.total_size,
+        "chunk_size": upload.chunk_size,
+        "total_chunks": count,
+        "offset": min(contiguous * upload.chunk_size, upload.total_size),
+        "missing_chunks": [index for index in range(count) if index not in received],
+        "expires_at": upload.expires_at
+    }
+
+def create_upload_files(upload: MaterialUpload):
+    os.makedirs(chunk_dir(upload.id))
+    # Sparse: no disk blocks are used until chunks are written
+    with open(partial_upload_path(upload.id), "wb") as file:
+        file.truncate(upload.total_size)
+
+def remove_upload_files(upload_id: str):
+    shutil.rmtree(chunk_dir(upload_id), ignore_errors=True)
+    try:
+        os.remove(partial_upload_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+def mark_chunk(marker: str):
+    # "a": a parallel retry of the same chunk may have marked it already
+    open(marker, "a").close()
+
+def write_at(fd: int, data: bytes, offset: int):
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_upload_checksum(value: str) -> bytes:
+    algorithm, _, encoded = value.strip().partition(" ")
+    try:
+        if algorithm.lower() != "sha256":
+            raise ValueError
+        digest = base64.b64decode(encoded, validate=True)
+        if len(digest) != 32:
+            raise ValueError
+    except (ValueError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload-Checksum must be 'sha256 <base64 digest>'"
+        )
+    return digest
+
+async def get_upload_or_404(upload_id: str, course_id: int, user: User, db: AsyncSession) -> MaterialUpload:
+    upload = await db.scalar(select(MaterialUpload).where(
+        MaterialUpload.id == upload_id,
+        MaterialUpload.course_id == course_id,
+        MaterialUpload.user_id == user.id,
+        MaterialUpload.expires_at > datetime.utcnow()
+    ))
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return upload
+
+# Routes
+@materials_router.post("/{course_id}/materials/uploads", response_model=MaterialUploadResponse, status_code=status.HTTP_201_CREATED)
+async def create_material_upload(
+    course_id: int,
+    upload_create: MaterialUploadCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    instructor = await get_instructor_or_404(current_user, db)
+
+    course = await db.scalar(select(Course).where(
+        Course.id == course_id,
+        Course.instructor_id == instructor.id
+    ))
+
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or you don't have permission to edit it"
+        )
+
+    if upload_create.size <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty file"
+        )
+    if upload_create.size > MATERIAL_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is larger than {MATERIAL_MAX_BYTES} bytes"
+        )
+    extension = os.path.splitext(upload_create.filename)[1].lstrip(".").lower()
+    if extension not in MATERIAL_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Unsupported file type"
+        )
+    checksum = upload_create.checksum.lower() if upload_create.checksum else None
+    if checksum is not None and not SHA256_HEX.match(checksum):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="checksum must be a hex SHA-256 digest"
+        )
+
+    upload = MaterialUpload(
+        id=uuid.uuid4().hex,
+        course_id=course_id,
+        user_id=current_user.id,
+        title=upload_create.title,
+        description=upload_create.description,
+        filename=os.path.basename(upload_create.filename),
+        extension=extension,
+        total_size=upload_create.size,
+        chunk_size=MATERIAL_CHUNK_SIZE,
+        checksum=checksum,
+        expires_at=datetime.utcnow() + timedelta(hours=MATERIAL_UPLOAD_TTL_HOURS)
+    )
+    await run_in_threadpool(create_upload_files, upload)
+    db.add(upload)
+    try:
+        await db.commit()
+    except BaseException:
+        await run_in_threadpool(remove_upload_files, upload.id)
+        raise
+
+    response.headers["Location"] = f"/api/courses/{course_id}/materials/uploads/{upload.id}"
+    return upload_status(upload)
+
+@materials_router.api_route("/{course_id}/materials/uploads/{upload_id}", methods=["GET", "HEAD"], response_model=MaterialUploadResponse)
+async def get_material_upload(
+    course_id: int,
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    upload = await get_upload_or_404(upload_id, course_id, current_user, db)
+    upload_state = await run_in_threadpool(upload_status, upload)
+
+    response.headers["Upload-Offset"] = str(upload_state["offset"])
+    response.headers["Upload-Length"] = str(upload.total_size)
+    response.headers["Cache-Control"] = "no-store"
+    return upload_state
+
+@materials_router.put("/{course_id}/materials/uploads/{upload_id}/chunks/{index}", response_model=MaterialUploadResponse)
+async def upload_material_chunk(
+    course_id: int,
+    upload_id: str,
+    index: int,
+    request: Request,
+    upload_checksum: str = Header(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    upload = await get_upload_or_404(upload_id, course_id, current_user, db)
+    # Hand the connection back to the pool while the chunk streams in
+    await db.commit()
+
+    if index < 0 or index >= total_chunks(upload):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk index must be between 0 and {total_chunks(upload) - 1}"
+        )
+    expected_digest = parse_upload_checksum(upload_checksum)
+    start = index * upload.chunk_size
+    expected_size = min(upload.chunk_size, upload.total_size - start)
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length != str(expected_size):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk {index} must be {expected_size} bytes"
+        )
+
+    # The chunk's bytes are about to change, so it no longer counts as received
+    marker = os.path.join(chunk_dir(upload.id), str(index))
+    try:
+        await run_in_threadpool(os.remove, marker)
+    except FileNotFoundError:
+        pass
+
+    try:
+        fd = await run_in_threadpool(os.open, partial_upload_path(upload.id), os.O_WRONLY)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    digest = hashlib.sha256()
+    received = 0
+    buffer = bytearray()
+    try:
+        async for piece in request.stream():
+            received += len(piece)
+            if received > expected_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Chunk {index} must be {expected_size} bytes"
+                )
+            digest.update(piece)
+            buffer += piece
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(write_at, fd, bytes(buffer), start + received - len(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(write_at, fd, bytes(buffer), start + received - len(buffer))
+    finally:
+        os.close(fd)
+
+    if received != expected_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk {index} must be {expected_size} bytes"
+        )
+    if digest.digest() != expected_digest:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chunk checksum mismatch"
+        )
+    try:
+        await run_in_threadpool(mark_chunk, marker)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+
+    # Active uploads do not expire
+    upload.expires_at = datetime.utcnow() + timedelta(hours=MATERIAL_UPLOAD_TTL_HOURS)
+    await db.execute(
+        update(MaterialUpload)
+        .where(MaterialUpload.id == upload.id)
+        .values(expires_at=upload.expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    return await run_in_threadpool(upload_status, upload)
+
+@materials_router.post("/{course_id}/materials/uploads/{upload_id}/complete", response_model=CourseMaterialResponse, status_code=status.HTTP_201_CREATED)
+async def complete_material_upload(
+    course_id: int,
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    upload = await get_upload_or_404(upload_id, course_id, current_user, db)
+    await db.commit()
+
+    upload_state = await run_in_threadpool(upload_status, upload)
+    if upload_state["missing_chunks"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is missing {len(upload_state['missing_chunks'])} chunks"
+        )
+
+    partial_path = partial_upload_path(upload.id)
+    try:
+        digest = await run_in_threadpool(file_sha256, partial_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    if upload.checksum and digest != upload.checksum:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File checksum mismatch"
+        )
+
+    try:
+        stored_path = await run_in_threadpool(save_partial, partial_path, "materials", digest, upload.extension)
+    except FileNotFoundError:
+        # Completed by a parallel request
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    await run_in_threadpool(remove_upload_files, upload.id)
+
+    material = CourseMaterial(
+        course_id=course_id,
+        title=upload.title,
+        file_url=media_url(stored_path),
+        file_type=MATERIAL_TYPES[upload.extension],
+        file_size=upload.total_size,
+        description=upload.description
+    )
+    db.add(material)
+    await db.execute(delete(MaterialUpload).where(MaterialUpload.id == upload.id))
+    await db.commit()
+    await db.refresh(material)
+
+    return material
+
+@materials_router.delete("/{course_id}/materials/uploads/{upload_id}")
+async def cancel_material_upload(
+    course_id: int,
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    upload = await get_upload_or_404(upload_id, course_id, current_user, db)
+    await db.execute(delete(MaterialUpload).where(MaterialUpload.id == upload.id))
+    await db.commit()
+    await run_in_threadpool(remove_upload_files, upload.id)
+
+    return {"message": "Upload cancelled"}
+
+# Drops uploads nobody has sent a chunk to within the TTL; returns how many
+async def expire_material_uploads(db: AsyncSession) -> int:
+    expired = (await db.scalars(
+        select(MaterialUpload.id).where(MaterialUpload.expires_at <= datetime.utcnow())
+    )).all()
+    if not expired:
+        return 0
+    await db.execute(delete(MaterialUpload).where(MaterialUpload.id.in_(expired)))
+    await db.commit()
+    for upload_id in expired:
+        await run_in_threadpool(remove_upload_files, upload_id)
+    return len(expired)
+
+async def expire_material_uploads_periodically():
+    while True:
+        await asyncio.sleep(UPLOAD_CLEANUP_SECONDS)
+        try:
+            async with SessionLocal() as db:
+                expired = await expire_material_uploads(db)
+            if expired:
+                print(f"Expired material uploads: {expired}")
+        except Exception as e:
+            print(f"Material upload cleanup failed: {e}")
@@ -0,0 +1,322 @@
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from concurrent.futures import ProcessPoolExecutor
+from pydantic import BaseModel
+from decouple import config
+from datetime import datetime, timezone
+from typing import Optional
+import asyncio
+import hashlib
+import mimetypes
+import multiprocessing
+import os
+import re
+import stat
+import uuid
+
+from conditional import make_etag, validator_headers, is_not_modified
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it only the original is kept
+    Image = None
+
+# Uploaded media is content-addressed: stored under the hash of its bytes,
+# so the same image uploaded twice (or for two courses) is kept once and its
+# URL never changes meaning. Files live under MEDIA_ROOT and are served at
+# MEDIA_URL.
+MEDIA_ROOT = config("MEDIA_ROOT", default="uploads")
+MEDIA_URL = "/media"
+LEGACY_MEDIA_URL = "/uploads"  # paths stored before content addressing
+UPLOAD_CHUNK_SIZE = config("UPLOAD_CHUNK_SIZE", default=1024 * 1024, cast=int)  # bytes
+THUMBNAIL_MAX_BYTES = config("THUMBNAIL_MAX_BYTES", default=5 * 1024 * 1024, cast=int)
+MEDIA_WORKERS = config("MEDIA_WORKERS", default=2, cast=int)  # image processes
+# Behind nginx: internal location prefix mapped to MEDIA_ROOT, e.g. /_media/;
+# the app then only checks the request and nginx sends the file
+MEDIA_ACCEL_REDIRECT = config("MEDIA_ACCEL_REDIRECT", default="")
+MEDIA_SEND_CHUNK_SIZE = 256 * 1024  # read size when the server cannot sendfile
+
+# Thumbnail variants: name -> width in pixels (height keeps the aspect ratio)
+THUMBNAIL_VARIANTS = {"card": 480, "detail": 960, "retina": 1920}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# Leading bytes -> extension of the image formats accepted as thumbnails
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+class ThumbnailVariant(BaseModel):
+    width: int
+    webp: str
+    jpeg: str
+
+def image_extension(head: bytes) -> Optional[str]:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+def media_path(kind: str, digest: str, suffix: str) -> str:
+    # Two-character shards keep directories small
+    return os.path.join(kind, digest[:2], f"{digest}{suffix}")
+
+def media_url(relative_path: str) -> str:
+    return f"{MEDIA_URL}/{relative_path.replace(os.sep, '/')}"
+
+def partial_upload_path(name: str) -> str:
+    return os.path.join(MEDIA_ROOT, "partial", name)
+
+# Moves a fully written file from MEDIA_ROOT/partial to its content address
+# and returns that path relative to MEDIA_ROOT; a duplicate is discarded
+def save_partial(partial_path: str, kind: str, digest: str, extension: str) -> str:
+    relative_path = media_path(kind, digest, f".{extension}")
+    final_path = os.path.join(MEDIA_ROOT, relative_path)
+    if os.path.exists(final_path):
+        os.remove(partial_path)
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(partial_path, final_path)
+    return relative_path
+
+# Streams an upload to MEDIA_ROOT/<kind>/ in chunks, hashing as it goes;
+# returns the stored path relative to MEDIA_ROOT. Duplicates of an existing
+# file are discarded and the existing path is returned.
+async def store_upload(file: UploadFile, kind: str, max_bytes: int, sniff=None) -> str:
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is larger than {max_bytes} bytes"
+        )
+
+    partial_path = partial_upload_path(uuid.uuid4().hex)
+    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+    digest = hashlib.sha256()
+    extension = None
+    size = 0
+    try:
+        with open(partial_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if extension is None:
+                    extension = sniff(chunk) if sniff else os.path.splitext(file.filename or "")[1].lstrip(".").lower()
+                    if not extension:
+                        raise HTTPException(
+                            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Unsupported file type"
+                        )
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File is larger than {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+
+        if not size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Empty file"
+            )
+
+        return save_partial(partial_path, kind, digest.hexdigest(), extension)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+# Runs in a worker process: writes the WebP and JPEG variants next to the
+# original (skipping ones already rendered) and returns their paths
+def render_variants(relative_path: str) -> dict:
+    source = os.path.join(MEDIA_ROOT, relative_path)
+    stem = os.path.splitext(relative_path)[0]
+    variants = {}
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for name, width in THUMBNAIL_VARIANTS.items():
+            # Never upscale; small originals give same-size variants
+            width = min(width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            resized = None
+            paths = {"webp": f"{stem}-{name}.webp", "jpeg": f"{stem}-{name}.jpg"}
+            for fmt, path in paths.items():
+                target = os.path.join(MEDIA_ROOT, path)
+                if os.path.exists(target):
+                    continue
+                if resized is None:
+                    resized = image.resize((width, height), Image.LANCZOS)
+                if fmt == "webp":
+                    resized.save(target + ".part", "WEBP", quality=WEBP_QUALITY, method=4)
+                else:
+                    resized.convert("RGB").save(target + ".part", "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+                os.replace(target + ".part", target)
+            variants[name] = {"width": width, **paths}
+    return variants
+
+_media_pool = None
+
+def media_pool() -> ProcessPoolExecutor:
+    global _media_pool
+    if _media_pool is None:
+        # spawn: workers do not inherit the server's threads and connections
+        _media_pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _media_pool
+
+def shutdown_media_pool():
+    global _media_pool
+    if _media_pool is not None:
+        _media_pool.shutdown(cancel_futures=True)
+        _media_pool = None
+
+# Variant URLs for a stored image, rendered off the event loop and outside
+# the GIL; None when Pillow is not installed
+async def thumbnail_variants(relative_path: str) -> Optional[dict]:
+    if Image is None:
+        return None
+    try:
+        variants = await asyncio.get_running_loop().run_in_executor(media_pool(), render_variants, relative_path)
+    except (OSError, Image.DecompressionBombError):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Image could not be processed"
+        )
+    return {
+        name: {"width": variant["width"], "webp": media_url(variant["webp"]), "jpeg": media_url(variant["jpeg"])}
+        for name, variant in variants.items()
+    }
+
+# Serving. Content-addressed files never change, so they are cached for a
+# year as immutable; anything else is revalidated. Range requests (seeking in
+# preview videos) are answered with 206. Whole files go out through sendfile
+# when the ASGI server offers it (pathsend / zerocopysend), or through nginx
+# with MEDIA_ACCEL_REDIRECT; otherwise, and for ranges, they are streamed in chunks.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})(-[a-z]+)?$")
+# Served inline; other types are downloaded so uploaded HTML or SVG never
+# runs on our origin
+INLINE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp", "application/pdf")
+INLINE_PREFIXES = ("video/", "audio/")
+HIDDEN_DIRS = {"partial"}
+
+media_router = APIRouter()
+
+SINGLE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# (start, end) of a plain single-range header, None for anything else
+def single_range(value: str, size: int):
+    match = SINGLE_RANGE.match(value.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size
+    else:
+        start, end = int(first), min(int(last) + 1, size) if last else size
+    return (start, end) if start < end else None
+
+# GETs of a whole file or a single range go out through the server's
+# sendfile extension when it offers one (ranges only with zerocopysend);
+# HEAD, If-Range, multiple or unsatisfiable ranges and servers without it
+# are left to FileResponse
+class MediaFileResponse(FileResponse):
+    chunk_size = MEDIA_SEND_CHUNK_SIZE
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        headers = Headers(scope=scope)
+        if scope["method"].upper() != "GET" or "if-range" in headers:
+            return await super().__call__(scope, receive, send)
+        if self.stat_result is None:
+            self.stat_result = await run_in_threadpool(os.stat, self.path)
+            self.set_stat_headers(self.stat_result)
+
+        if "range" not in headers:
+            if "http.response.pathsend" in extensions:
+                await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+                await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            elif "http.response.zerocopysend" in extensions:
+                await self.zerocopysend(send, self.status_code, 0, self.stat_result.st_size)
+            else:
+                return await super().__call__(scope, receive, send)
+        else:
+            size = self.stat_result.st_size
+            byte_range = single_range(headers["range"], size)
+            if byte_range is None or "http.response.zerocopysend" not in extensions:
+                return await super().__call__(scope, receive, send)
+            start, end = byte_range
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+            self.headers["content-length"] = str(end - start)
+            await self.zerocopysend(send, 206, start, end - start)
+        if self.background is not None:
+            await self.background()
+
+    async def zerocopysend(self, send, status_code: int, offset: int, count: int):
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({
+                "type": "http.response.zerocopysend", "file": file,
+                "offset": offset, "count": count, "more_body": False
+            })
+
+# (path relative to MEDIA_ROOT, stat) of a servable file; 404 for anything
+# outside MEDIA_ROOT, unfinished uploads, directories and missing files
+def resolve_media(path: str):
+    root = os.path.realpath(MEDIA_ROOT)
+    full_path = os.path.realpath(os.path.join(root, path))
+    relative_path = os.path.relpath(full_path, root)
+    parts = relative_path.split(os.sep)
+    if relative_path == os.curdir or parts[0] == os.pardir or parts[0] in HIDDEN_DIRS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return relative_path, stat_result
+
+def media_headers(relative_path: str, stat_result) -> tuple:
+    stem = os.path.splitext(os.path.basename(relative_path))[0]
+    last_modified = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc).replace(tzinfo=None)
+    if CONTENT_ADDRESSED.match(stem):
+        # The name is the content hash, so it is the validator too
+        etag = f'"{stem}"'
+        headers = {**validator_headers(etag, last_modified), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    else:
+        etag = make_etag(f"{relative_path}:{stat_result.st_mtime_ns}:{stat_result.st_size}".encode())
+        headers = validator_headers(etag, last_modified)
+    headers["X-Content-Type-Options"] = "nosniff"
+    return etag, last_modified, headers
+
+@media_router.api_route(MEDIA_URL + "/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+@media_router.api_route(LEGACY_MEDIA_URL + "/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_media(path: str, request: Request):
+    relative_path, stat_result = await run_in_threadpool(resolve_media, path)
+    etag, last_modified, headers = media_headers(relative_path, stat_result)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+    disposition = "inline" if media_type in INLINE_TYPES or media_type.startswith(INLINE_PREFIXES) else "attachment"
+    if MEDIA_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + relative_path.replace(os.sep, "/")
+        headers["Content-Disposition"] = disposition
+        return Response(media_type=media_type, headers=headers)
+
+    return MediaFileResponse(
+        os.path.join(MEDIA_ROOT, relative_path),
+        headers=headers,
+        media_type=media_type,
+        stat_result=stat_result,
+        content_disposition_type=disposition,
+        filename=os.path.basename(relative_path) if disposition == "attachment" else None
+    )
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Index
+from sqlalchemy.orm import relationship, validates, query_expression
 from datetime import datetime
 from database import Base
+from normalize import fold_text, folded_district
 
 class User(Base):
     __tablename__ = "users"
@@ -20,6 +20,11 @@ class User(Base):
     profile_image = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Search shadow columns (normalize.fold_text), kept in sync by _fold
+    full_name_folded = Column(String, nullable=True)
+    email_folded = Column(String, nullable=True)
+    city_folded = Column(String, nullable=True)
+    district_folded = Column(String, nullable=True)
     
     # Relationships
     enrollments = relationship("Enrollment", back_populates="student")
@@ -27,6 +32,20 @@ class User(Base):
     reviews_given = relationship("Review", back_populates="reviewer", foreign_keys="Review.reviewer_id")
     payments = relationship("Payment", back_populates="user")
 
+    __table_args__ = (
+        # Keyset pagination (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Folded search: name / email prefix, city / district equality
+        Index("ix_users_full_name_folded", "full_name_folded", postgresql_ops={"full_name_folded": "text_pattern_ops"}),
+        Index("ix_users_email_folded", "email_folded", postgresql_ops={"email_folded": "text_pattern_ops"}),
+        Index("ix_users_city_district_folded", "city_folded", "district_folded"),
+    )
+
+    @validates("full_name", "email", "city", "district")
+    def _fold(self, key, value):
+        setattr(self, f"{key}_folded", fold_text(value))
+        return value
+
 class Instructor(Base):
     __tablename__ = "instructors"
     
@@ -35,18 +54,35 @@ class Instructor(Base):
     bio = Column(Text, nullable=True)
     specialization = Column(String, nullable=True)
     experience_years = Column(Integer, default=0)
-    rating = Column(Float, default=0.0)
+    rating = Column(Float, default=0.0)  # rating_sum / total_ratings, rounded (see ratings.py)
     total_ratings = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)
     total_students = Column(Integer, default=0)
     is_approved = Column(Boolean, default=False)
     certification = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    specialization_folded = Column(String, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="instructor_profile")
     courses = relationship("Course", back_populates="instructor")
     reviews_received = relationship("Review", back_populates="instructor", foreign_keys="Review.instructor_id")
 
+    __table_args__ = (
+        # Keyset pagination: public listing (rating, total_students, id), admin listing (created_at, id)
+        Index("ix_instructors_approved_rating_students_id", "is_approved", "rating", "total_students", "id"),
+        Index("ix_instructors_created_at_id", "created_at", "id"),
+        Index(
+            "ix_instructors_specialization_folded", "specialization_folded",
+            postgresql_ops={"specialization_folded": "text_pattern_ops"}
+        ),
+    )
+
+    @validates("specialization")
+    def _fold(self, key, value):
+        self.specialization_folded = fold_text(value)
+        return value
+
 class Course(Base):
     __tablename__ = "courses"
     
@@ -63,6 +99,7 @@ class Course(Base):
     subcategory = Column(String, nullable=True)
     language = Column(String, default="Turkish")
     thumbnail = Column(String, nullable=True)
+    thumbnail_variants = Column(JSON, nullable=True)  # name -> {width, webp, jpeg} URLs
     preview_video = Column(String, nullable=True)
     location = Column(String, nullable=True)  # For location-based courses
     latitude = Column(Float, nullable=True)
@@ -70,10 +107,14 @@ class Course(Base):
     is_online = Column(Boolean, default=True)
     is_published = Column(Boolean, default=False)
     enrollment_count = Column(Integer, default=0)
-    rating = Column(Float, default=0.0)
+    rating = Column(Float, default=0.0)  # rating_sum / total_ratings, rounded (see ratings.py)
     total_ratings = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    title_folded = Column(String, nullable=True)
+    location_folded = Column(String, nullable=True)
+    district_folded = Column(String, nullable=True)  # location after the city
     
     # Relationships
     instructor = relationship("Instructor", back_populates="courses")
@@ -82,6 +123,30 @@ class Course(Base):
     reviews = relationship("Review", back_populates="course")
     materials = relationship("CourseMaterial", back_populates="course")
 
+    __table_args__ = (
+        # Keyset pagination: catalog (is_published, created_at, id), admin listing (created_at, id)
+        Index("ix_courses_published_created_at_id", "is_published", "created_at", "id"),
+        Index("ix_courses_created_at_id", "created_at", "id"),
+        # Catalog filters used by get_courses
+        Index("ix_courses_published_category_price", "is_published", "category", "price"),
+        Index("ix_courses_published_level_price", "is_published", "level", "price"),
+        Index("ix_courses_published_online_price", "is_published", "is_online", "price"),
+        Index("ix_courses_published_price", "is_published", "price"),
+        Index("ix_courses_instructor_published", "instructor_id", "is_published"),
+        # Folded search: title prefix, location (city) prefix, district prefix
+        Index("ix_courses_title_folded", "title_folded", postgresql_ops={"title_folded": "text_pattern_ops"}),
+        Index("ix_courses_location_folded", "location_folded", postgresql_ops={"location_folded": "text_pattern_ops"}),
+        Index("ix_courses_district_folded", "district_folded", postgresql_ops={"district_folded": "text_pattern_ops"}),
+    )
+
+    @validates("title", "location")
+    def _fold(self, key, value):
+        setattr(self, f"{key}_folded", fold_text(value))
+        if key == "location":
+            # Locations are "<city> <district>", e.g. "İstanbul Kadıköy"
+            self.district_folded = folded_district(self.location_folded)
+        return value
+
 class Lesson(Base):
     __tablename__ = "lessons"
     
@@ -100,6 +165,10 @@ class Lesson(Base):
     course = relationship("Course", back_populates="lessons")
     progress = relationship("LessonProgress", back_populates="lesson")
 
+    __table_args__ = (
+        Index("ix_lessons_course_order", "course_id", "order_index"),
+    )
+
 class CourseMaterial(Base):
     __tablename__ = "course_materials"
     
@@ -108,13 +177,31 @@ class CourseMaterial(Base):
     title = Column(String, nullable=False)
     file_url = Column(String, nullable=False)
     file_type = Column(String, nullable=False)  # pdf, doc, video, etc.
-    file_size = Column(Integer, nullable=True)
+    file_size = Column(BigInteger, nullable=True)  # videos can pass 2 GiB
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     course = relationship("Course", back_populates="materials")
 
+class MaterialUpload(Base):
+    # A resumable CourseMaterial upload in progress; its chunks are written
+    # straight into MEDIA_ROOT/partial/<id>
+    __tablename__ = "material_uploads"
+    
+    id = Column(String, primary_key=True)  # uuid4 hex
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    filename = Column(String, nullable=False)
+    extension = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    checksum = Column(String, nullable=True)  # sha256 hex of the whole file, if the client sent one
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 class Enrollment(Base):
     __tablename__ = "enrollments"
     
@@ -130,6 +217,17 @@ class Enrollment(Base):
     student = relationship("User", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
     lesson_progress = relationship("LessonProgress", back_populates="enrollment")
+    
+    # Lesson progress summary, filled per query with with_expression()
+    completed_lessons = query_expression()
+    total_lessons = query_expression()
+    watch_time_seconds = query_expression()
+
+    __table_args__ = (
+        Index("ix_enrollments_student_course", "student_id", "course_id"),
+        Index("ix_enrollments_student_enrolled_at_id", "student_id", "enrolled_at", "id"),
+        Index("ix_enrollments_course_id", "course_id"),
+    )
 
 class LessonProgress(Base):
     __tablename__ = "lesson_progress"
@@ -145,6 +243,10 @@ class LessonProgress(Base):
     enrollment = relationship("Enrollment", back_populates="lesson_progress")
     lesson = relationship("Lesson", back_populates="progress")
 
+    __table_args__ = (
+        Index("ix_lesson_progress_enrollment_completed", "enrollment_id", "is_completed"),
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
     
@@ -162,6 +264,17 @@ class Review(Base):
     course = relationship("Course", back_populates="reviews")
     instructor = relationship("Instructor", back_populates="reviews_received", foreign_keys=[instructor_id])
 
+    __table_args__ = (
+        # Keyset pagination: instructor reviews and pending moderation queue (created_at, id)
+        Index("ix_reviews_instructor_approved_created_at_id", "instructor_id", "is_approved", "created_at", "id"),
+        Index("ix_reviews_approved_created_at_id", "is_approved", "created_at", "id"),
+        Index("ix_reviews_reviewer_course", "reviewer_id", "course_id"),
+        Index("ix_reviews_course_approved", "course_id", "is_approved"),
+        # Rating recompute: grouped sums served from the index alone
+        Index("ix_reviews_approved_course_rating", "is_approved", "course_id", "rating"),
+        Index("ix_reviews_approved_instructor_rating", "is_approved", "instructor_id", "rating"),
+    )
+
 class Payment(Base):
     __tablename__ = "payments"
     
@@ -177,6 +290,16 @@ class Payment(Base):
     
     # Relationships
     user = relationship("User", back_populates="payments")
+    course = relationship("Course")
+
+    __table_args__ = (
+        Index("ix_payments_user_course_status", "user_id", "course_id", "payment_status"),
+        Index("ix_payments_course_status", "course_id", "payment_status"),
+        # My-payments (a user's payments, newest first)
+        Index("ix_payments_user_date", "user_id", "payment_date"),
+        # Revenue analytics (completed payments by date)
+        Index("ix_payments_status_date", "payment_status", "payment_date"),
+    )
 
 class AIInteraction(Base):
     __tablename__ = "ai_interactions"
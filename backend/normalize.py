@@ -0,0 +1,45 @@
+from sqlalchemy import and_, true
+from typing import Optional
+import unicodedata
+
+from database import engine
+
+# Turkish-aware search folding: Turkish lowercasing (I -> ı, İ -> i), then
+# diacritics stripped (ı -> i, ş -> s, ğ -> g, ç -> c, ö -> o, ü -> u), so
+# "İSTANBUL", "ISTANBUL" and "istanbul" all fold to "istanbul". Shadow
+# *_folded columns hold the folded value and are indexed for prefix and
+# equality matching.
+TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+
+def fold_text(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = unicodedata.normalize("NFC", value).translate(TURKISH_UPPER).lower().replace("ı", "i")
+    value = "".join(char for char in unicodedata.normalize("NFKD", value) if not unicodedata.combining(char))
+    return " ".join(value.split())
+
+# District part of a folded "<city> <district>" location (Turkish province
+# names are one word); None when the location is only a city
+def folded_district(folded_location: Optional[str]) -> Optional[str]:
+    if not folded_location:
+        return None
+    parts = folded_location.split(" ", 1)
+    return parts[1] if len(parts) > 1 else None
+
+def folded_equals(column, value: str):
+    return column == fold_text(value)
+
+# `column` starts with the folded `value`, as an index range scan
+def folded_prefix(column, value: str):
+    prefix = fold_text(value)
+    if not prefix:
+        return true()
+
+    if engine.dialect.name == "sqlite":
+        # Explicit range on the BINARY-collated index (SQLite only rewrites
+        # LIKE into a range for case-insensitive indexes)
+        return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+    # PostgreSQL serves this from the text_pattern_ops index
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.like(f"{escaped}%", escape="\\")
@@ -0,0 +1,53 @@
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import DateTime, tuple_
+from datetime import datetime
+import base64
+import json
+
+# Opt-in keyset (cursor) pagination for list endpoints.
+# Pass `cursor=` (empty) for the first page, then the value of the
+# X-Next-Cursor response header; the header is absent on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CursorQuery = Query(
+    None,
+    description="Keyset pagination: empty for the first page, then the X-Next-Cursor header of the previous page"
+)
+
+def encode_cursor(values: list) -> str:
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, keys: list) -> list:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("cursor does not match sort keys")
+        return [
+            datetime.fromisoformat(value) if isinstance(key.type, DateTime) and value is not None else value
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+# Order by `keys` (all descending, last key unique) and seek past the cursor.
+# One extra row is fetched so finish_keyset_page knows whether a next page exists.
+def keyset_page(query, keys: list, cursor: str, limit: int):
+    query = query.order_by(*(key.desc() for key in keys))
+    if cursor:
+        query = query.where(tuple_(*keys) < tuple(decode_cursor(cursor, keys)))
+    return query.limit(limit + 1)
+
+def finish_keyset_page(rows, keys: list, limit: int, response: Response) -> list:
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+    return rows
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 import uuid
 
-from database import get_db
-from models import Payment, User, Course, Enrollment
+from database import get_db, pin_reads_to_primary
+from models import Payment, User, Course, Enrollment, Instructor
 from auth import get_current_user
+from cache import course_cache
+from counters import count_enrollment
+from serialization import response_fields, row_dict, json_response
 
 payments_router = APIRouter()
 
@@ -16,6 +21,12 @@ class PaymentCreate(BaseModel):
     course_id: int
     payment_method: str = "iyzico"
 
+class PaymentCourse(BaseModel):
+    id: int
+    title: str
+    thumbnail: Optional[str]
+    instructor_name: str
+
 class PaymentResponse(BaseModel):
     id: int
     amount: float
@@ -24,11 +35,14 @@ class PaymentResponse(BaseModel):
     payment_status: str
     transaction_id: Optional[str]
     payment_date: datetime
-    course: dict
+    course: PaymentCourse
 
     class Config:
         from_attributes = True
 
+PAYMENT_FIELDS = response_fields(PaymentResponse, exclude=("course",))
+PAYMENT_COURSE_FIELDS = response_fields(PaymentCourse, exclude=("instructor_name",))
+
 # Mock Iyzico integration (replace with actual integration)
 class MockIyzicoService:
     @staticmethod
@@ -57,14 +71,15 @@ iyzico_service = MockIyzicoService()
 @payments_router.post("/create-payment")
 async def create_payment(
     payment_create: PaymentCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Get course
-    course = db.query(Course).filter(
+    course = await db.scalar(select(Course).where(
         Course.id == payment_create.course_id,
         Course.is_published == True
-    ).first()
+    ))
     
     if not course:
         raise HTTPException(
@@ -73,10 +88,10 @@ async def create_payment(
         )
     
     # Check if already enrolled
-    existing_enrollment = db.query(Enrollment).filter(
+    existing_enrollment = await db.scalar(select(Enrollment).where(
         Enrollment.student_id == current_user.id,
         Enrollment.course_id == payment_create.course_id
-    ).first()
+    ))
     
     if existing_enrollment:
         raise HTTPException(
@@ -85,11 +100,11 @@ async def create_payment(
         )
     
     # Check if payment already exists
-    existing_payment = db.query(Payment).filter(
+    existing_payment = await db.scalar(select(Payment).where(
         Payment.user_id == current_user.id,
         Payment.course_id == payment_create.course_id,
         Payment.payment_status.in_(["pending", "completed"])
-    ).first()
+    ))
     
     if existing_payment:
         if existing_payment.payment_status == "completed":
@@ -118,8 +133,8 @@ async def create_payment(
     )
     
     db.add(payment)
-    db.commit()
-    db.refresh(payment)
+    await db.commit()
+    await db.refresh(payment)
     
     # Create payment with Iyzico (mock)
     user_data = {
@@ -146,7 +161,8 @@ async def create_payment(
     
     if iyzico_response["status"] == "success":
         payment.transaction_id = iyzico_response["transaction_id"]
-        db.commit()
+        await db.commit()
+        pin_reads_to_primary(response)
         
         return {
             "payment_id": payment.id,
@@ -157,7 +173,7 @@ async def create_payment(
         }
     else:
         payment.payment_status = "failed"
-        db.commit()
+        await db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -167,14 +183,15 @@ async def create_payment(
 @payments_router.post("/verify-payment/{payment_id}")
 async def verify_payment(
     payment_id: int,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Get payment
-    payment = db.query(Payment).filter(
+    payment = await db.scalar(select(Payment).where(
         Payment.id == payment_id,
         Payment.user_id == current_user.id
-    ).first()
+    ))
     
     if not payment:
         raise HTTPException(
@@ -205,14 +222,13 @@ async def verify_payment(
         )
         db.add(enrollment)
         
-        # Update course enrollment count
-        course = db.query(Course).filter(Course.id == payment.course_id).first()
-        course.enrollment_count += 1
+        # Course enrollment count and instructor total students, as atomic increments
+        course = await db.scalar(select(Course).where(Course.id == payment.course_id))
+        await count_enrollment(db, course)
         
-        # Update instructor total students
-        course.instructor.total_students += 1
-        
-        db.commit()
+        await db.commit()
+        course_cache.invalidate(course.id)
+        pin_reads_to_primary(response)
         
         return {
             "status": "success",
@@ -221,49 +237,46 @@ async def verify_payment(
         }
     else:
         payment.payment_status = "failed"
-        db.commit()
+        await db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment verification failed"
         )
 
-@payments_router.get("/my-payments")
+@payments_router.get("/my-payments", response_model=List[PaymentResponse])
 async def get_my_payments(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    payments = db.query(Payment).filter(Payment.user_id == current_user.id).order_by(Payment.payment_date.desc()).all()
+    payments = (await db.scalars(
+        select(Payment)
+        .options(joinedload(Payment.course).joinedload(Course.instructor).joinedload(Instructor.user))
+        .where(Payment.user_id == current_user.id)
+        .order_by(Payment.payment_date.desc())
+    )).all()
     
-    result = []
-    for payment in payments:
-        course = db.query(Course).filter(Course.id == payment.course_id).first()
-        
-        course_info = {
-            "id": course.id,
-            "title": course.title,
-            "thumbnail": course.thumbnail,
-            "instructor_name": course.instructor.user.full_name
-        }
-        
-        payment_dict = {
-            **payment.__dict__,
-            "course": course_info
+    return json_response(List[PaymentResponse], [
+        {
+            **row_dict(payment, PAYMENT_FIELDS),
+            "course": {
+                **row_dict(payment.course, PAYMENT_COURSE_FIELDS),
+                "instructor_name": payment.course.instructor.user.full_name
+            }
         }
-        result.append(PaymentResponse(**payment_dict))
-    
-    return result
+        for payment in payments
+    ])
 
 @payments_router.get("/payment/{payment_id}")
 async def get_payment(
     payment_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    payment = db.query(Payment).filter(
+    payment = await db.scalar(select(Payment).where(
         Payment.id == payment_id,
         Payment.user_id == current_user.id
-    ).first()
+    ))
     
     if not payment:
         raise HTTPException(
@@ -271,13 +284,15 @@ async def get_payment(
             detail="Payment not found"
         )
     
-    course = db.query(Course).filter(Course.id == payment.course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == payment.course_id))
+    instructor = await course.awaitable_attrs.instructor
+    instructor_user = await instructor.awaitable_attrs.user
     
     course_info = {
         "id": course.id,
         "title": course.title,
         "thumbnail": course.thumbnail,
-        "instructor_name": course.instructor.user.full_name,
+        "instructor_name": instructor_user.full_name,
         "price": course.price,
         "discount_price": course.discount_price
     }
@@ -293,7 +308,7 @@ async def get_payment(
 @payments_router.post("/webhook/iyzico")
 async def iyzico_webhook(
     # webhook_data: dict,  # Iyzico webhook payload
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Handle Iyzico webhook for payment status updates
     # This would be implemented with actual Iyzico webhook payload processing
@@ -0,0 +1,99 @@
+from sqlalchemy import select, update, func, case, cast, exists, or_, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
+from decouple import config
+import asyncio
+
+from database import SessionLocal
+from models import Course, Instructor, Review
+from cache import course_cache
+
+# Course and instructor ratings are kept as an exact sum and count of the
+# approved reviews (rating_sum, total_ratings), changed with atomic UPDATEs.
+# The stored `rating` average (sorted and filtered on) is re-derived from
+# them in the same statement, so concurrent reviews never lose an update
+# and rounding never accumulates. A periodic recompute rebuilds everything
+# from Review with one grouped query per table.
+RATING_RECOMPUTE_SECONDS = config("RATING_RECOMPUTE_SECONDS", default=3600, cast=float)
+
+# (model, Review column pointing at it)
+RATED = ((Course, Review.course_id), (Instructor, Review.instructor_id))
+
+def average_rating(rating_sum, total_ratings):
+    return case(
+        (total_ratings > 0, func.round(cast(rating_sum * 1.0 / total_ratings, Numeric), 2)),
+        else_=0.0
+    )
+
+# Adds (sign=1) or removes (sign=-1) an approved review's contribution
+async def count_review(db: AsyncSession, review: Review, sign: int = 1):
+    for model, column in RATED:
+        target_id = getattr(review, column.key)
+        if target_id is None:
+            continue
+        rating_sum = model.rating_sum + sign * review.rating
+        total_ratings = model.total_ratings + sign
+        await db.execute(
+            update(model)
+            .where(model.id == target_id)
+            .values(rating_sum=rating_sum, total_ratings=total_ratings, rating=average_rating(rating_sum, total_ratings))
+            .execution_options(synchronize_session=False)
+        )
+
+# Rewrites only the rows whose sum or count drifted; returns how many
+async def recompute_ratings(db: AsyncSession) -> dict:
+    fixed = {}
+    for model, column in RATED:
+        totals = (
+            select(
+                column.label("target_id"),
+                func.sum(Review.rating).label("rating_sum"),
+                func.count(Review.id).label("total_ratings")
+            )
+            .where(Review.is_approved == True, column.isnot(None))
+            .group_by(column)
+            .subquery()
+        )
+        changed = await db.execute(
+            update(model)
+            .where(
+                model.id == totals.c.target_id,
+                or_(
+                    func.coalesce(model.rating_sum, -1) != totals.c.rating_sum,
+                    func.coalesce(model.total_ratings, -1) != totals.c.total_ratings
+                )
+            )
+            .values(
+                rating_sum=totals.c.rating_sum,
+                total_ratings=totals.c.total_ratings,
+                rating=average_rating(totals.c.rating_sum, totals.c.total_ratings)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        # Rows left without any approved review
+        cleared = await db.execute(
+            update(model)
+            .where(
+                or_(model.total_ratings != 0, model.rating_sum != 0, model.rating != 0),
+                ~exists().where(column == model.id, Review.is_approved == True)
+            )
+            .values(rating_sum=0, total_ratings=0, rating=0.0)
+            .execution_options(synchronize_session=False)
+        )
+        fixed[model.__tablename__] = changed.rowcount + cleared.rowcount
+
+    await db.commit()
+    if any(fixed.values()):
+        course_cache.clear()
+    return fixed
+
+async def recompute_ratings_periodically():
+    while True:
+        await asyncio.sleep(RATING_RECOMPUTE_SECONDS)
+        try:
+            async with SessionLocal() as db:
+                fixed = await recompute_ratings(db)
+            if any(fixed.values()):
+                print(f"Recomputed ratings: {fixed}")
+        except Exception as e:
+            print(f"Rating recompute failed: {e}")
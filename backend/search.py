@@ -0,0 +1,101 @@
+from sqlalchemy import text, table, column, literal_column, func, or_
+from decouple import config
+import re
+
+from database import engine
+from models import Course
+
+# Full-text search over Course.title / description / category:
+# FTS5 (external content table kept in sync by triggers) on SQLite,
+# a generated tsvector column with a GIN index on PostgreSQL.
+SEARCH_TS_CONFIG = config("SEARCH_TS_CONFIG", default="simple")
+
+courses_fts = table("courses_fts", column("rowid"), column("rank"))
+
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(
+        title, description, category,
+        content='courses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_ai AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_ad AFTER DELETE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description, category)
+        VALUES ('delete', old.id, old.title, old.description, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_au AFTER UPDATE OF title, description, category ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description, category)
+        VALUES ('delete', old.id, old.title, old.description, old.category);
+        INSERT INTO courses_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, new.category);
+    END
+    """,
+]
+
+POSTGRES_FTS_DDL = [
+    f"""
+    ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_courses_search_vector ON courses USING GIN (search_vector)",
+]
+
+# Called once at startup, inside the create_all transaction
+async def setup_course_search(conn):
+    if conn.dialect.name == "sqlite":
+        existing = await conn.scalar(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'courses_fts'"
+        ))
+        for statement in SQLITE_FTS_DDL:
+            await conn.execute(text(statement))
+        if not existing:
+            # Index rows that were written before the FTS table existed
+            await conn.execute(text("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        for statement in POSTGRES_FTS_DDL:
+            await conn.execute(text(statement))
+
+def search_terms(search: str) -> list:
+    return re.findall(r"\w+", search)
+
+# Filter a Course select by `search` (prefix match on every term) and, when
+# `ranked`, order it by relevance
+def apply_course_search(query, search: str, ranked: bool = True):
+    terms = search_terms(search)
+    if not terms:
+        return query
+
+    if engine.dialect.name == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        query = query.join(courses_fts, courses_fts.c.rowid == Course.id).where(
+            literal_column("courses_fts").op("MATCH")(match)
+        )
+        return query.order_by(courses_fts.c.rank, Course.id) if ranked else query
+
+    if engine.dialect.name == "postgresql":
+        tsquery = func.to_tsquery(SEARCH_TS_CONFIG, " & ".join(f"{term}:*" for term in terms))
+        search_vector = literal_column("courses.search_vector")
+        query = query.where(search_vector.op("@@")(tsquery))
+        return query.order_by(func.ts_rank_cd(search_vector, tsquery).desc(), Course.id) if ranked else query
+
+    return query.where(
+        or_(
+            Course.title.ilike(f"%{search}%"),
+            Course.description.ilike(f"%{search}%"),
+            Course.category.ilike(f"%{search}%")
+        )
+    )
@@ -0,0 +1,31 @@
+from fastapi import Response
+from pydantic import TypeAdapter
+from functools import lru_cache
+
+# Read responses are projected from the loaded ORM rows into plain dicts,
+# validated once and serialized once by pydantic-core. Returning the Response
+# directly skips FastAPI's second validation pass against response_model,
+# which stays on the route for the docs.
+@lru_cache(maxsize=None)
+def type_adapter(model_type) -> TypeAdapter:
+    return TypeAdapter(model_type)
+
+def response_fields(model, exclude=()) -> tuple:
+    return tuple(name for name in model.model_fields if name not in exclude)
+
+# Loaded column values read straight from the instance dict: no attribute
+# descriptors, no lazy loads, no _sa_instance_state
+def row_dict(obj, fields) -> dict:
+    values = obj.__dict__
+    return {field: values.get(field) for field in fields}
+
+def dump_json(model_type, value) -> bytes:
+    adapter = type_adapter(model_type)
+    return adapter.dump_json(adapter.validate_python(value))
+
+def json_response(model_type, value, response: Response = None) -> Response:
+    result = Response(content=dump_json(model_type, value), media_type="application/json")
+    if response is not None:
+        # Headers and cookies set on the injected Response (cursor, validators, read pinning)
+        result.headers.raw.extend(response.headers.raw)
+    return result
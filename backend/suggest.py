@@ -0,0 +1,196 @@
+from fastapi import APIRouter, Query, Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from decouple import config
+from typing import Optional, List
+from bisect import bisect_left, insort
+import asyncio
+
+from database import SessionLocal
+from models import Course, Instructor, User
+from normalize import fold_text
+from serialization import dump_json
+
+# Typeahead over published course titles, categories and approved instructor
+# names, answered from memory. Every word suffix of a folded label is a key
+# in one sorted list, so "kur" finds "Python Kursu" and a lookup is a bisect
+# plus a short scan. Short prefixes match too many keys for a bounded scan to
+# find the most popular labels, so their ranking is computed over every match
+# once and kept until a write touches a key with that prefix. Writes update
+# the index in place; a periodic rebuild picks up changes made by other workers.
+SUGGEST_REFRESH_SECONDS = config("SUGGEST_REFRESH_SECONDS", default=300, cast=float)
+SUGGEST_MAX_WORDS = 8  # word suffixes indexed per label
+SUGGEST_MAX_LIMIT = 20  # suggestions per response
+SUGGEST_SHORT_PREFIX = 3  # folded prefixes up to this length use the cached top-k
+SUGGEST_SCAN_LIMIT = 200  # keys examined per longer-prefix lookup before ranking
+
+suggest_router = APIRouter()
+
+class Suggestion(BaseModel):
+    type: str  # course, category, instructor
+    id: Optional[int]
+    label: str
+
+def label_keys(label: str) -> list:
+    words = (fold_text(label) or "").split()[:SUGGEST_MAX_WORDS]
+    return [" ".join(words[index:]) for index in range(len(words))]
+
+class SuggestIndex:
+    def __init__(self):
+        self._keys = []  # sorted (key, kind, ref)
+        self._entries = {}  # (kind, ref) -> (label, weight, keys)
+        self._course_categories = {}  # published course id -> category
+        self._category_counts = {}
+        self._top = {}  # short prefix -> ranked suggestions (top SUGGEST_MAX_LIMIT)
+        self.version = 0
+
+    def _forget(self, key: str):
+        for length in range(1, SUGGEST_SHORT_PREFIX + 1):
+            self._top.pop(key[:length], None)
+
+    def _put(self, kind: str, ref, label: str, weight: int):
+        self._drop(kind, ref)
+        keys = label_keys(label)
+        for key in keys:
+            insort(self._keys, (key, kind, ref))
+            self._forget(key)
+        self._entries[(kind, ref)] = (label, weight, keys)
+
+    def _drop(self, kind: str, ref):
+        entry = self._entries.pop((kind, ref), None)
+        if entry is None:
+            return
+        for key in entry[2]:
+            self._forget(key)
+            index = bisect_left(self._keys, (key, kind, ref))
+            if index < len(self._keys) and self._keys[index] == (key, kind, ref):
+                del self._keys[index]
+
+    def _count_category(self, category: str, delta: int):
+        count = self._category_counts.get(category, 0) + delta
+        if count > 0:
+            self._category_counts[category] = count
+            self._put("category", category, category, count)
+        else:
+            self._category_counts.pop(category, None)
+            self._drop("category", category)
+
+    def update_course(self, course: Course):
+        self.version += 1
+        old_category = self._course_categories.pop(course.id, None)
+        if old_category is not None:
+            self._count_category(old_category, -1)
+
+        if course.is_published:
+            self._put("course", course.id, course.title, course.enrollment_count or 0)
+            if course.category:
+                self._course_categories[course.id] = course.category
+                self._count_category(course.category, 1)
+        else:
+            self._drop("course", course.id)
+
+    # Bulk load: entries first, then a single sort of all keys
+    def load(self, courses: list, instructors: list):
+        self._keys, self._entries, self._course_categories, self._category_counts = [], {}, {}, {}
+        self._top = {}
+        for course in courses:
+            self._entries[("course", course.id)] = (course.title, course.enrollment_count or 0, label_keys(course.title))
+            if course.category:
+                self._course_categories[course.id] = course.category
+                self._category_counts[course.category] = self._category_counts.get(course.category, 0) + 1
+        for category, count in self._category_counts.items():
+            self._entries[("category", category)] = (category, count, label_keys(category))
+        for instructor, full_name in instructors:
+            self._entries[("instructor", instructor.id)] = (full_name, instructor.total_students or 0, label_keys(full_name))
+        self._keys = sorted(
+            (key, kind, ref) for (kind, ref), (label, weight, keys) in self._entries.items() for key in keys
+        )
+
+    def swap(self, other: "SuggestIndex"):
+        self._keys, self._entries = other._keys, other._entries
+        self._course_categories, self._category_counts = other._course_categories, other._category_counts
+        self._top = {}
+
+    def update_instructor(self, instructor: Instructor, full_name: str):
+        self.version += 1
+        if instructor.is_approved:
+            self._put("instructor", instructor.id, full_name, instructor.total_students or 0)
+        else:
+            self._drop("instructor", instructor.id)
+
+    def search(self, q: str, limit: int) -> list:
+        prefix = fold_text(q)
+        if not prefix:
+            return []
+
+        if len(prefix) > SUGGEST_SHORT_PREFIX:
+            return self._rank(prefix, SUGGEST_SCAN_LIMIT)[:limit]
+        ranked = self._top.get(prefix)
+        if ranked is None:
+            ranked = self._top[prefix] = self._rank(prefix)[:SUGGEST_MAX_LIMIT]
+        return ranked[:limit]
+
+    # Labels with a key starting with `prefix`: label-start matches first, then
+    # by popularity. scan_limit bounds the keys examined (None: every match).
+    def _rank(self, prefix: str, scan_limit: int = None) -> list:
+        matches = {}
+        index = bisect_left(self._keys, (prefix,))
+        while index < len(self._keys) and (scan_limit is None or len(matches) < scan_limit):
+            key, kind, ref = self._keys[index]
+            if not key.startswith(prefix):
+                break
+            label, weight, keys = self._entries[(kind, ref)]
+            # Matches at the start of the label rank above mid-label word matches
+            starts_label = keys[0].startswith(prefix)
+            best = matches.get((kind, ref))
+            if best is None or (starts_label and not best[0]):
+                matches[(kind, ref)] = (starts_label, weight, label)
+            index += 1
+
+        ranked = sorted(matches.items(), key=lambda item: (not item[1][0], -item[1][1], item[1][2]))
+        return [
+            {"type": kind, "id": ref if kind != "category" else None, "label": label}
+            for (kind, ref), (starts_label, weight, label) in ranked
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._keys),
+            "entries": len(self._entries),
+            "cached_prefixes": len(self._top),
+            "version": self.version
+        }
+
+suggest_index = SuggestIndex()
+
+async def rebuild_suggest_index():
+    # Built aside and swapped in; reloaded if a write landed on the live
+    # index while the rows were being read
+    for _ in range(3):
+        version = suggest_index.version
+        async with SessionLocal() as db:
+            courses = (await db.scalars(select(Course).where(Course.is_published == True))).all()
+            instructors = (await db.execute(
+                select(Instructor, User.full_name).join(User).where(Instructor.is_approved == True)
+            )).all()
+
+        index = SuggestIndex()
+        index.load(courses, instructors)
+        if suggest_index.version == version:
+            suggest_index.swap(index)
+            return
+
+async def refresh_suggest_index_periodically():
+    while True:
+        await asyncio.sleep(SUGGEST_REFRESH_SECONDS)
+        try:
+            await rebuild_suggest_index()
+        except Exception as e:
+            print(f"Suggest index refresh failed: {e}")
+
+@suggest_router.get("/suggest", response_model=List[Suggestion])
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT)
+):
+    return Response(content=dump_json(List[Suggestion], suggest_index.search(q, limit)), media_type="application/json")
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# Settings are read at import time: point the app at a scratch database and
+# media directory before anything imports it (removed in pytest_sessionfinish)
+TEST_DIR = tempfile.mkdtemp(prefix="education-platform-tests-")
+TEST_DATABASE = os.path.join(TEST_DIR, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DATABASE}"
+os.environ["MEDIA_ROOT"] = os.path.join(TEST_DIR, "media")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import database
+from auth import create_access_token
+from cache import course_cache
+from main import app
+from models import User, Instructor, Course, Lesson, Enrollment, Review, Payment
+
+COURSE_COUNT = 150
+
+async def seed() -> dict:
+    async with database.SessionLocal() as db:
+        admin = User(email="admin@example.com", phone="5000000000", password_hash="x", full_name="Admin", role="admin")
+        student = User(email="ogrenci@example.com", phone="5000000001", password_hash="x", full_name="Öğrenci", city="Ankara")
+        db.add_all([admin, student])
+        instructors = []
+        for index in range(5):
+            user = User(
+                email=f"egitmen{index}@example.com", phone=f"51000000{index:02d}", password_hash="x",
+                full_name=f"Eğitmen {index}", role="instructor", city="İstanbul"
+            )
+            instructors.append(Instructor(
+                user=user, bio="Deneyimli eğitmen", specialization=["Matematik", "Gitar"][index % 2],
+                experience_years=index + 1, is_approved=True
+            ))
+        db.add_all(instructors)
+        await db.flush()
+        
+        created = datetime.utcnow() - timedelta(days=COURSE_COUNT)
+        courses = [
+            Course(
+                title=f"Python Kursu {index}" if index % 2 else f"Gitar Dersi {index}",
+                description="Başlangıçtan ileri seviyeye " * 5,
+                price=100 + index, duration_hours=10,
+                category="Yazılım" if index % 3 else "Müzik", level=["beginner", "intermediate", "advanced"][index % 3],
+                instructor=instructors[index % len(instructors)], is_published=True, is_online=bool(index % 2),
+                location="İstanbul, Kadıköy", latitude=40.99 + index * 0.001, longitude=29.03 + index * 0.001,
+                created_at=created + timedelta(days=index)
+            )
+            for index in range(COURSE_COUNT)
+        ]
+        db.add_all(courses)
+        await db.flush()
+        
+        # The first course carries a curriculum and reviews, the second none:
+        # detail and list queries must not grow with either
+        db.add_all(
+            Lesson(course_id=courses[0].id, title=f"Ders {index}", duration_minutes=30, order_index=index)
+            for index in range(1, 21)
+        )
+        db.add_all(
+            Enrollment(student_id=student.id, course_id=course.id, enrolled_at=created + timedelta(hours=index))
+            for index, course in enumerate(courses[:30])
+        )
+        db.add_all(
+            Review(
+                reviewer_id=student.id, course_id=course.id, instructor_id=course.instructor_id,
+                rating=4, comment="Faydalı", is_approved=False
+            )
+            for course in courses[:30]
+        )
+        # Payments of the student and of ten other buyers, so planner
+        # statistics see a selective user_id
+        buyers = [
+            User(email=f"alici{index}@example.com", phone=f"53000000{index:02d}", password_hash="x", full_name=f"Alıcı {index}")
+            for index in range(10)
+        ]
+        db.add_all(buyers)
+        await db.flush()
+        purchases = [(student, course) for course in courses[:30]] + [
+            (buyer, course) for index, buyer in enumerate(buyers) for course in courses[30 + index * 10:40 + index * 10]
+        ]
+        db.add_all(
+            Payment(
+                user_id=user.id, course_id=course.id, amount=course.price, payment_method="iyzico",
+                payment_status="completed", transaction_id=f"TX{user.id}-{course.id}",
+                payment_date=created + timedelta(hours=index)
+            )
+            for index, (user, course) in enumerate(purchases)
+        )
+        await db.commit()
+        return {
+            "admin": admin.id,
+            "student": student.id,
+            "instructor": instructors[0].user_id,
+            "courses": [course.id for course in courses]
+        }
+
+# Planner statistics as a restarted server would have them for the seeded data
+async def refresh_statistics():
+    async with database.engine.begin() as conn:
+        await database.refresh_sqlite_statistics(conn)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        client.seeded = client.portal.call(seed)
+        client.portal.call(refresh_statistics)
+        yield client
+
+@pytest.fixture(scope="session")
+def database_path() -> str:
+    return TEST_DATABASE
+
+@pytest.fixture(scope="session")
+def seeded(client) -> dict:
+    return client.seeded
+
+def auth_headers(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+@pytest.fixture
+def admin_headers(seeded) -> dict:
+    return auth_headers(seeded["admin"])
+
+@pytest.fixture
+def student_headers(seeded) -> dict:
+    return auth_headers(seeded["student"])
+
+# Teaches every fifth seeded course, starting with the first
+@pytest.fixture
+def instructor_headers(seeded) -> dict:
+    return auth_headers(seeded["instructor"])
+
+# Every statement the app sends (writer and reader pools), with parameters
+@pytest.fixture
+def statements(client):
+    executed = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+    
+    engines = [engine.sync_engine for engine in (database.engine, database.reader_engine) if engine is not None]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    course_cache.clear()
+    yield executed
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", record)
+
+# After the client fixture has shut the app down and disposed the engines
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
@@ -0,0 +1,20 @@
+# Course detail is validated by ETag only: the body embeds instructor fields
+# whose changes no updated_at records
+
+def test_course_detail_sends_etag_without_last_modified(client, seeded):
+    url = f"/api/courses/{seeded['courses'][0]}"
+    for params in ({}, {"fields": "id,title,instructor"}):
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        assert "ETag" in response.headers
+        assert "Last-Modified" not in response.headers
+        
+        revalidated = client.get(url, params=params, headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+def test_course_detail_ignores_if_modified_since(client, seeded):
+    response = client.get(
+        f"/api/courses/{seeded['courses'][0]}",
+        headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
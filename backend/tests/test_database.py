@@ -0,0 +1,27 @@
+from sqlalchemy import select
+
+import database
+from models import User
+
+# A transaction that has written reads through the writer connection
+async def write_then_read() -> tuple:
+    async with database.SessionLocal() as db:
+        db.add(User(email="yazici@example.com", phone="5200000000", password_hash="x", full_name="Yazıcı"))
+        await db.flush()
+        own_row = await db.scalar(select(User.id).where(User.email == "yazici@example.com"))
+        await db.rollback()
+        after_rollback = db.get_bind(clause=select(User)) is database.engine.sync_engine
+        return own_row, after_rollback
+
+async def lock_bind():
+    async with database.SessionLocal() as db:
+        return db.get_bind(clause=select(User).with_for_update())
+
+def test_transaction_reads_its_own_writes(client):
+    own_row, after_rollback = client.portal.call(write_then_read)
+    assert own_row is not None
+    # A new transaction reads from the reader pool again
+    assert not after_rollback
+
+def test_select_for_update_uses_writer(client):
+    assert client.portal.call(lock_bind) is database.engine.sync_engine
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import courses
+
+LESSONS = [{"title": f"Ders {index}", "duration_minutes": 20} for index in range(1, 4)]
+
+@pytest.fixture
+def import_url(seeded) -> str:
+    # Taught by the instructor_headers user; the first two courses stay untouched
+    return f"/api/courses/{seeded['courses'][5]}/lessons/bulk"
+
+def test_import_within_limit(client, import_url, instructor_headers):
+    response = client.post(import_url, json=LESSONS, headers=instructor_headers)
+    assert response.status_code == 201
+    assert [lesson["title"] for lesson in response.json()] == ["Ders 1", "Ders 2", "Ders 3"]
+
+def test_oversized_content_length_is_rejected(client, import_url, instructor_headers, monkeypatch):
+    body = json.dumps(LESSONS).encode()
+    monkeypatch.setattr(courses, "LESSON_IMPORT_MAX_BYTES", len(body) - 1)
+    response = client.post(
+        import_url, content=body, headers={**instructor_headers, "Content-Type": "application/json"}
+    )
+    assert response.status_code == 413
+
+def test_oversized_chunked_body_is_rejected(client, import_url, instructor_headers, monkeypatch):
+    monkeypatch.setattr(courses, "LESSON_IMPORT_MAX_BYTES", 1024)
+    
+    def chunks():
+        yield b"title,duration_minutes\n"
+        for index in range(200):
+            yield f"Ders {index},20\n".encode()
+    
+    response = client.post(import_url, content=chunks(), headers={**instructor_headers, "Content-Type": "text/csv"})
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
@@ -0,0 +1,68 @@
+import anyio
+
+from media import MediaFileResponse
+
+def call(response, method: str = "GET", headers: list = (), extensions: dict = None) -> list:
+    scope = {"type": "http", "method": method, "headers": list(headers), "extensions": extensions or {}}
+    messages = []
+    
+    async def receive():
+        return {"type": "http.disconnect"}
+    
+    async def send(message):
+        messages.append(message)
+    
+    anyio.run(response, scope, receive, send)
+    return messages
+
+def media_file(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(range(256)) * 8)
+    return path
+
+def test_whole_file_uses_pathsend(tmp_path):
+    path = media_file(tmp_path)
+    messages = call(MediaFileResponse(path), extensions={"http.response.pathsend": {}})
+    assert messages[0]["status"] == 200
+    assert (b"content-length", b"2048") in messages[0]["headers"]
+    assert messages[1] == {"type": "http.response.pathsend", "path": str(path)}
+
+def test_whole_file_uses_zerocopysend(tmp_path):
+    messages = call(MediaFileResponse(media_file(tmp_path)), extensions={"http.response.zerocopysend": {}})
+    assert messages[1]["type"] == "http.response.zerocopysend"
+
+def test_single_range_uses_zerocopysend(tmp_path):
+    messages = call(
+        MediaFileResponse(media_file(tmp_path)),
+        headers=[(b"range", b"bytes=-48")],
+        extensions={"http.response.zerocopysend": {}}
+    )
+    assert messages[0]["status"] == 206
+    assert (b"content-range", b"bytes 2000-2047/2048") in messages[0]["headers"]
+    assert (messages[1]["offset"], messages[1]["count"]) == (2000, 48)
+
+def test_unsatisfiable_range_is_left_to_file_response(tmp_path):
+    messages = call(
+        MediaFileResponse(media_file(tmp_path)),
+        headers=[(b"range", b"bytes=4096-")],
+        extensions={"http.response.zerocopysend": {}}
+    )
+    assert messages[0]["status"] == 416
+
+def test_range_is_streamed_by_file_response(tmp_path):
+    messages = call(
+        MediaFileResponse(media_file(tmp_path)),
+        headers=[(b"range", b"bytes=10-19")],
+        extensions={"http.response.pathsend": {}}
+    )
+    assert messages[0]["status"] == 206
+    assert b"".join(message.get("body", b"") for message in messages[1:]) == bytes(range(10, 20))
+
+def test_head_and_plain_servers_use_file_response(tmp_path):
+    path = media_file(tmp_path)
+    head = call(MediaFileResponse(path), method="HEAD", extensions={"http.response.pathsend": {}})
+    assert [message["type"] for message in head] == ["http.response.start", "http.response.body"]
+    assert head[1]["body"] == b""
+    
+    plain = call(MediaFileResponse(path))
+    assert b"".join(message.get("body", b"") for message in plain[1:]) == path.read_bytes()
@@ -0,0 +1,48 @@
+# Round trips per request stay constant: instructor and instructor user are
+# joined into the page query instead of lazily loaded per row
+
+def select_count(statements) -> int:
+    return sum(1 for statement, parameters in statements if statement.lstrip().upper().startswith("SELECT"))
+
+def test_course_list_page_is_one_statement(client, statements):
+    response = client.get("/api/courses/", params={"limit": 100})
+    assert response.status_code == 200
+    assert len(response.json()) == 100
+    assert len(statements) == 1
+
+def test_course_list_cursor_pages_are_one_statement(client, statements):
+    response = client.get("/api/courses/", params={"limit": 100, "cursor": ""})
+    assert response.status_code == 200
+    assert len(statements) == 1
+    
+    statements.clear()
+    response = client.get("/api/courses/", params={"limit": 100, "cursor": response.headers["X-Next-Cursor"]})
+    assert response.status_code == 200
+    assert response.json()
+    assert len(statements) == 1
+
+def test_course_detail_is_one_statement(client, statements, seeded):
+    # The first course has lessons, enrollments and reviews, the second none
+    for course_id in seeded["courses"][:2]:
+        statements.clear()
+        response = client.get(f"/api/courses/{course_id}")
+        assert response.status_code == 200
+        assert response.json()["instructor"]["name"]
+        assert len(statements) == 1
+
+def test_course_detail_cache_hit_runs_no_statement(client, statements, seeded):
+    course_id = seeded["courses"][0]
+    assert client.get(f"/api/courses/{course_id}").status_code == 200
+    
+    statements.clear()
+    assert client.get(f"/api/courses/{course_id}").status_code == 200
+    assert statements == []
+
+def test_my_courses_statements_do_not_grow_with_enrollments(client, statements, student_headers):
+    # Current user, then enrollments with course, instructor and progress counts
+    for limit in (1, 30):
+        statements.clear()
+        response = client.get("/api/courses/my-courses", params={"limit": limit}, headers=student_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        assert select_count(statements) == 2
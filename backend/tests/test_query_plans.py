@@ -0,0 +1,145 @@
+import re
+import sqlite3
+
+import pytest
+
+from database import Base
+
+TABLES = set(Base.metadata.tables)
+
+# "SCAN courses" without an index: every row of the table is read
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+def query_plans(database_path: str, statements) -> list:
+    with sqlite3.connect(database_path) as conn:
+        return [
+            (statement, [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)])
+            for statement, parameters in statements
+            if statement.lstrip().upper().startswith("SELECT")
+        ]
+
+def assert_indexed(database_path: str, statements, sorted_matches: bool = False):
+    plans = query_plans(database_path, statements)
+    assert plans
+    for statement, plan in plans:
+        for step in plan:
+            match = FULL_SCAN.match(step)
+            assert not (match and match.group(1) in TABLES), f"full table scan ({step}):\n{statement}"
+            if not sorted_matches:
+                assert step != SORT, f"sort instead of an ordered index:\n{statement}"
+
+# Every page of a request: the first one, then one more through the cursor
+def get_pages(client, statements, url: str, params: dict, headers: dict = None) -> list:
+    response = client.get(url, params=params, headers=headers)
+    assert response.status_code == 200
+    executed = list(statements)
+    next_cursor = response.headers.get("X-Next-Cursor")
+    if next_cursor:
+        response = client.get(url, params={**params, "cursor": next_cursor}, headers=headers)
+        assert response.status_code == 200
+        executed.extend(statements[len(executed):])
+    return executed
+
+LIST_FILTERS = [
+    {},
+    {"category": "Yazılım"},
+    {"level": "beginner"},
+    {"is_online": "true"},
+    {"category": "Yazılım", "level": "beginner", "is_online": "false"},
+]
+
+@pytest.mark.parametrize("cursor", [None, ""], ids=["offset", "cursor"])
+@pytest.mark.parametrize("filters", LIST_FILTERS, ids=lambda filters: ",".join(filters) or "unfiltered")
+def test_course_list_uses_ordered_index(client, database_path, statements, filters, cursor):
+    params = {**filters, "limit": 10}
+    if cursor is not None:
+        params["cursor"] = cursor
+    assert_indexed(database_path, get_pages(client, statements, "/api/courses/", params))
+
+# A price range, location prefix or full-text match is looked up through its
+# own index and only the matching rows are sorted
+RANGE_FILTERS = [
+    {"min_price": 120, "max_price": 200},
+    {"city": "istanbul"},
+    {"district": "kadikoy"},
+    {"search": "python"},
+]
+
+@pytest.mark.parametrize("cursor", [None, ""], ids=["offset", "cursor"])
+@pytest.mark.parametrize("filters", RANGE_FILTERS, ids=lambda filters: ",".join(filters))
+def test_course_list_range_filters_use_index(client, database_path, statements, filters, cursor):
+    params = {**filters, "limit": 10}
+    if cursor is not None:
+        params["cursor"] = cursor
+    assert_indexed(database_path, get_pages(client, statements, "/api/courses/", params), sorted_matches=True)
+
+def test_course_detail_uses_index(client, database_path, statements, seeded):
+    response = client.get(f"/api/courses/{seeded['courses'][0]}")
+    assert response.status_code == 200
+    assert_indexed(database_path, statements)
+
+@pytest.mark.parametrize("cursor", [None, ""], ids=["offset", "cursor"])
+def test_my_courses_uses_index(client, database_path, statements, student_headers, cursor):
+    params = {"limit": 5} if cursor is None else {"limit": 5, "cursor": cursor}
+    assert_indexed(database_path, get_pages(client, statements, "/api/courses/my-courses", params, student_headers))
+
+INSTRUCTOR_FILTERS = [
+    {},
+    {"specialization": "matem"},
+    {"city": "istanbul"},
+    {"search": "egitmen"},
+    {"min_rating": 3},
+]
+
+@pytest.mark.parametrize("cursor", [None, ""], ids=["offset", "cursor"])
+@pytest.mark.parametrize("filters", INSTRUCTOR_FILTERS, ids=lambda filters: ",".join(filters) or "unfiltered")
+def test_instructor_list_uses_index(client, database_path, statements, filters, cursor):
+    params = {**filters, "limit": 2}
+    if cursor is not None:
+        params["cursor"] = cursor
+    assert_indexed(database_path, get_pages(client, statements, "/api/instructors/", params))
+
+@pytest.mark.parametrize("cursor", [None, ""], ids=["offset", "cursor"])
+def test_pending_reviews_use_index(client, database_path, statements, admin_headers, cursor):
+    params = {"limit": 5} if cursor is None else {"limit": 5, "cursor": cursor}
+    assert_indexed(database_path, get_pages(client, statements, "/api/admin/reviews/pending", params, admin_headers))
+
+def test_my_payments_use_index(client, database_path, statements, student_headers):
+    response = client.get("/api/payments/my-payments", headers=student_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+    assert_indexed(database_path, statements)
+
+def test_payment_lookup_uses_index(client, database_path, statements, seeded, student_headers):
+    # An existing completed payment: looked up by user, course and status
+    response = client.post(
+        "/api/payments/create-payment", json={"course_id": seeded["courses"][0]}, headers=student_headers
+    )
+    assert response.status_code == 400
+    assert_indexed(database_path, statements)
+
+ADMIN_LISTINGS = [
+    ("/api/admin/users", {}),
+    ("/api/admin/users", {"search": "egitmen"}),
+    ("/api/admin/users", {"role": "instructor"}),
+    ("/api/admin/users", {"city": "istanbul"}),
+    ("/api/admin/instructors", {}),
+    ("/api/admin/instructors", {"is_approved": "true"}),
+    ("/api/admin/instructors", {"search": "egitmen"}),
+    ("/api/admin/courses", {}),
+    ("/api/admin/courses", {"is_published": "true"}),
+    ("/api/admin/courses", {"category": "Yazılım"}),
+    ("/api/admin/courses", {"search": "python"}),
+]
+
+@pytest.mark.parametrize("cursor", [None, ""], ids=["offset", "cursor"])
+@pytest.mark.parametrize(
+    "url, filters", ADMIN_LISTINGS,
+    ids=lambda value: value.rsplit("/", 1)[-1] if isinstance(value, str) else ",".join(value) or "unfiltered"
+)
+def test_admin_listing_uses_index(client, database_path, statements, admin_headers, url, filters, cursor):
+    params = {**filters, "limit": 5}
+    if cursor is not None:
+        params["cursor"] = cursor
+    assert_indexed(database_path, get_pages(client, statements, url, params, admin_headers))
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+from suggest import SuggestIndex, SUGGEST_SCAN_LIMIT
+
+def course(course_id: int, title: str, enrollment_count: int = 0, category: str = None):
+    return SimpleNamespace(
+        id=course_id, title=title, enrollment_count=enrollment_count, category=category, is_published=True
+    )
+
+def labels(results: list) -> list:
+    return [result["label"] for result in results]
+
+# More keys share the prefix than a bounded scan examines, and the popular
+# label sorts alphabetically after all of them
+def crowded_index() -> SuggestIndex:
+    index = SuggestIndex()
+    courses = [course(number, f"Gitar {number:04d}") for number in range(1, SUGGEST_SCAN_LIMIT + 100)]
+    index.load(courses + [course(10000, "Gözde Usta Keman", enrollment_count=500)], [])
+    return index
+
+def test_short_prefix_ranks_every_match_by_popularity():
+    index = crowded_index()
+    assert labels(index.search("g", 3))[0] == "Gözde Usta Keman"
+    assert labels(index.search("GÖ", 3)) == ["Gözde Usta Keman"]
+
+def test_short_prefix_ranking_follows_writes():
+    index = crowded_index()
+    assert labels(index.search("g", 1)) == ["Gözde Usta Keman"]
+    
+    index.update_course(course(7, "Gitar 0007", enrollment_count=900))
+    assert labels(index.search("g", 2)) == ["Gitar 0007", "Gözde Usta Keman"]
+    
+    index.update_course(SimpleNamespace(id=7, title="Gitar 0007", enrollment_count=900, category=None, is_published=False))
+    assert labels(index.search("g", 1)) == ["Gözde Usta Keman"]
+
+def test_label_start_matches_rank_above_word_matches():
+    index = SuggestIndex()
+    index.load([course(1, "Python Kursu", enrollment_count=5), course(2, "Kurumsal Yazılım", enrollment_count=1)], [])
+    assert labels(index.search("kur", 5)) == ["Kurumsal Yazılım", "Python Kursu"]
@@ -10,6 +10,9 @@ export const api = axios.create({
     'Content-Type': 'application/json',
   },
   timeout: 10000, // 10 saniye timeout
+  // Sends the API's read-your-writes cookie back, so reads right after
+  // enrolling or paying are served from the primary database
+  withCredentials: true,
 })
 
 // Request interceptor to add auth token
@@ -53,10 +56,11 @@ export const authAPI = {
 export const coursesAPI = {
   getCourses: (params?: any) => api.get('/api/courses', { params }),
   getCourse: (id: number) => api.get(`/api/courses/${id}`),
+  getCoursesBatch: (ids: number[]) => api.get('/api/courses/batch', { params: { ids: ids.join(',') } }),
   createCourse: (data: any) => api.post('/api/courses', data),
   updateCourse: (id: number, data: any) => api.put(`/api/courses/${id}`, data),
   enrollInCourse: (id: number) => api.post(`/api/courses/${id}/enroll`),
-  getMyCourses: () => api.get('/api/courses/my-courses'),
+  getMyCourses: (params?: any) => api.get('/api/courses/my-courses', { params }),
   createReview: (courseId: number, data: any) => api.post(`/api/courses/${courseId}/reviews`, data),
   getCategories: () => api.get('/api/courses/categories/list'),
   uploadThumbnail: (courseId: number, file: File) => {
@@ -67,12 +71,36 @@ export const coursesAPI = {
     })
   },
   createLesson: (courseId: number, data: any) => api.post(`/api/courses/${courseId}/lessons`, data),
+  // Curriculum as an array of lessons or CSV text (header row of field names)
+  importLessons: (courseId: number, lessons: any[] | string) =>
+    api.post(`/api/courses/${courseId}/lessons/bulk`, lessons, typeof lessons === 'string' ? { headers: { 'Content-Type': 'text/csv' } } : undefined),
+  reorderLessons: (courseId: number, lessonIds: number[]) => api.put(`/api/courses/${courseId}/lessons/order`, { lesson_ids: lessonIds }),
+  // Resumable material uploads: chunks can be sent in parallel and retried;
+  // getMaterialUpload lists the ones still missing after a dropped connection
+  createMaterialUpload: (courseId: number, data: { title: string, description?: string, filename: string, size: number, checksum?: string }) =>
+    api.post(`/api/courses/${courseId}/materials/uploads`, data),
+  getMaterialUpload: (courseId: number, uploadId: string) => api.get(`/api/courses/${courseId}/materials/uploads/${uploadId}`),
+  uploadMaterialChunk: async (courseId: number, uploadId: string, index: number, chunk: Blob) => {
+    const body = await chunk.arrayBuffer()
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', body))
+    return api.put(`/api/courses/${courseId}/materials/uploads/${uploadId}/chunks/${index}`, body, {
+      headers: {
+        'Content-Type': 'application/octet-stream',
+        'Upload-Checksum': `sha256 ${btoa(String.fromCharCode(...digest))}`,
+      },
+      timeout: 0,
+    })
+  },
+  completeMaterialUpload: (courseId: number, uploadId: string) =>
+    api.post(`/api/courses/${courseId}/materials/uploads/${uploadId}/complete`, null, { timeout: 0 }),
+  cancelMaterialUpload: (courseId: number, uploadId: string) => api.delete(`/api/courses/${courseId}/materials/uploads/${uploadId}`),
 }
 
 // Instructors API
 export const instructorsAPI = {
   getInstructors: (params?: any) => api.get('/api/instructors', { params }),
   getInstructor: (id: number) => api.get(`/api/instructors/${id}`),
+  getInstructorsBatch: (ids: number[]) => api.get('/api/instructors/batch', { params: { ids: ids.join(',') } }),
   applyAsInstructor: (data: any) => api.post('/api/instructors/apply', data),
   updateProfile: (data: any) => api.put('/api/instructors/profile', data),
   getMyProfile: () => api.get('/api/instructors/my/profile'),